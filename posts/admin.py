@@ -1,13 +1,91 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
+from . import moderation, search
 from .models import Comment, Follow, Group, Post
+from .paginator import CappedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class ScalableAdmin(admin.ModelAdmin):
+    '''Список, который открывается одинаково быстро на любом объёме.
+
+    Связанные объекты подтягиваются одним JOIN, число строк считается
+    с ограничением, а полный COUNT(*) без фильтров не выполняется.
+    '''
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class BatchedDeleteMixin:
+    '''Заменяет стандартное удаление выбранных на удаление пачками.
+
+    delete_selected загружает все объекты и удаляет их по одному
+    с каскадом, на тысячах строк это не укладывается в запрос.
+    '''
+    batched_delete = None
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_in_batches(self, request, queryset):
+        deleted = type(self).batched_delete(queryset)
+        self.message_user(
+            request,
+            f'Удалено: {deleted}, пачками по {moderation.BATCH_SIZE}.',
+            messages.SUCCESS
+        )
+    delete_in_batches.short_description = 'Удалить выбранные пачками'
+    delete_in_batches.allowed_permissions = ('delete',)
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(Group.objects.all(), required=False,
+                                   label='Группа')
+
+
+class PostAdmin(BatchedDeleteMixin, ScalableAdmin):
     list_display = ('text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date', 'group')
-    empty_value_display = '-пусто-'
+    autocomplete_fields = ('author', 'group')
+    action_form = PostActionForm
+    actions = ('delete_in_batches', 'move_to_group')
+    batched_delete = moderation.delete_posts
+
+    def move_to_group(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid():
+            self.message_user(request, 'Выберите существующую группу.',
+                              messages.ERROR)
+            return
+        group = form.cleaned_data['group']
+        moved = moderation.move_posts(queryset, group)
+        self.message_user(
+            request,
+            f'Перенесено в «{group or "без группы"}»: {moved}.',
+            messages.SUCCESS
+        )
+    move_to_group.short_description = 'Перенести выбранные в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def get_search_results(self, request, queryset, search_term):
+        '''Ищет по полнотекстовому индексу вместо LIKE по всей таблице'''
+        if not search.supported():
+            return super().get_search_results(request, queryset, search_term)
+        expression = search.match_expression(search_term)
+        if expression is None:
+            return queryset, False
+        return queryset.filter(
+            pk__in=search.matching_ids(expression)
+        ), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -16,16 +94,41 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(BatchedDeleteMixin, ScalableAdmin):
     list_display = ('pk', 'text', 'author', 'created', 'post',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('author', 'post')
+    # Сортировка по первичному ключу совпадает с порядком создания
+    # и не требует сортировки всей таблицы по created.
+    ordering = ('-pk',)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
+    actions = ('delete_in_batches',)
+    batched_delete = moderation.delete_comments
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdmin):
     list_display = ('user', 'author',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('user', 'author')
+    ordering = ('-pk',)
+    autocomplete_fields = ('user', 'author')
+
+
+class AuthorAdmin(UserAdmin):
+    actions = ('purge_content',)
+
+    def purge_content(self, request, queryset):
+        posts, comments = moderation.purge_authors(queryset)
+        self.message_user(
+            request,
+            f'Удалено постов: {posts}, комментариев: {comments}.',
+            messages.SUCCESS
+        )
+    purge_content.short_description = 'Удалить все посты и комментарии'
+    purge_content.allowed_permissions = ('delete',)
 
 
+admin.site.unregister(get_user_model())
+admin.site.register(get_user_model(), AuthorAdmin)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
@@ -0,0 +1,202 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import condition, require_safe
+
+from . import versions
+from .models import Group, Post
+from .paginator import KeysetPaginator
+
+User = get_user_model()
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+POST_FIELDS = {
+    'id': lambda post, request: post.pk,
+    'text': lambda post, request: post.text,
+    'pub_date': lambda post, request: post.pub_date.isoformat(),
+    'author': lambda post, request: post.author.username,
+    'group': lambda post, request: post.group.slug if post.group else None,
+    'image': lambda post, request: (
+        request.build_absolute_uri(post.image.url) if post.image else None
+    ),
+    'thumbnail': lambda post, request: (
+        request.build_absolute_uri(post.thumbnail_url)
+        if post.thumbnail else None
+    ),
+    'comment_count': lambda post, request: post.comment_count,
+    'url': lambda post, request: request.build_absolute_uri(reverse(
+        'posts:post', args=[post.author.username, post.pk]
+    )),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def requested_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return list(POST_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = set(fields) - set(POST_FIELDS)
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def serialize_post(post, fields, request):
+    return {field: POST_FIELDS[field](post, request) for field in fields}
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def feed_response(request, posts):
+    try:
+        fields = requested_fields(request)
+        paginator = KeysetPaginator(posts.for_feed(), page_size(request))
+    except BadRequest as bad_request:
+        return error(str(bad_request))
+    page = paginator.get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize_post(post, fields, request) for post in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+# Условный GET. Last-Modified - дата самого свежего поста ленты,
+# ETag дополнительно учитывает версию ленты, которая меняется при
+# правке, удалении и комментировании постов, и параметры запроса.
+# Если ничего не поменялось, condition() отвечает 304, не вызывая view.
+
+def feed_etag(version, request):
+    if version is None:
+        return None
+    key = '|'.join([str(version), request.GET.urlencode()])
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def newest(posts):
+    return posts.aggregate(newest=Max('pub_date'))['newest']
+
+
+def group_id(slug):
+    return Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+
+
+def author_id(username):
+    return User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+
+
+def index_etag(request):
+    return feed_etag(versions.index_version(), request)
+
+
+def index_modified(request):
+    return newest(Post.objects.all())
+
+
+def group_etag(request, slug):
+    pk = group_id(slug)
+    return feed_etag(pk and versions.group_version(pk), request)
+
+
+def group_modified(request, slug):
+    return newest(Post.objects.filter(group__slug=slug))
+
+
+def profile_etag(request, username):
+    pk = author_id(username)
+    return feed_etag(pk and versions.profile_version(pk), request)
+
+
+def profile_modified(request, username):
+    return newest(Post.objects.filter(author__username=username))
+
+
+def post_etag(request, username, post_id):
+    pk = author_id(username)
+    return feed_etag(pk and versions.profile_version(pk), request)
+
+
+def post_modified(request, username, post_id):
+    post = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).aggregate(published=Max('pub_date'), commented=Max('comments__created'))
+    if post['published'] is None:
+        return None
+    return max(filter(None, post.values()))
+
+
+@require_safe
+@condition(index_etag, index_modified)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_safe
+@condition(group_etag, group_modified)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error('Группа не найдена', status=404)
+    return feed_response(request, group.posts.all())
+
+
+@require_safe
+@condition(profile_etag, profile_modified)
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error('Автор не найден', status=404)
+    return feed_response(request, author.posts.all())
+
+
+@require_safe
+@condition(post_etag, post_modified)
+def post_view(request, username, post_id):
+    post = Post.objects.for_feed().filter(
+        pk=post_id, author__username=username
+    ).first()
+    if post is None:
+        return error('Запись не найдена', status=404)
+    try:
+        fields = requested_fields(request)
+    except BadRequest as bad_request:
+        return error(str(bad_request))
+    data = serialize_post(post, fields, request)
+    data['comments'] = [
+        {'id': comment.pk,
+         'author': comment.author.username,
+         'text': comment.text,
+         'created': comment.created.isoformat()}
+        for comment in post.comments.select_related('author')
+    ]
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
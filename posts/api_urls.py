@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.index, name='index'),
+    path('group/<slug:slug>/', api.group_posts, name='group'),
+    path('users/<str:username>/', api.profile, name='profile'),
+    path('users/<str:username>/<int:post_id>/', api.post_view,
+         name='post'),
+]
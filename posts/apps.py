@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Публикации'
+
+    def ready(self):
+        from django.conf import settings
+        from PIL import Image
+
+        from . import signals  # noqa: F401
+
+        # Pillow откажется открывать картинки больше этого предела
+        Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
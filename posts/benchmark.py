@@ -0,0 +1,115 @@
+import re
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post, User
+
+FEEDS = ('index', 'group', 'profile', 'post', 'follow_index')
+NEXT_LINK = re.compile(r'href="\?cursor=([\w-]+)">Следующая')
+# Холодные замеры очищают кэш: у замера свой, рабочий не трогаем
+BENCHMARK_CACHES = {
+    **settings.CACHES,
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+def feed_urls():
+    '''Адреса лент для самых «тяжёлых» автора, группы и подписчика.'''
+    author = User.objects.filter(
+        stats__isnull=False
+    ).order_by('-stats__posts_count').first()
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    reader = User.objects.filter(
+        stats__following_count__gt=0
+    ).order_by('-stats__following_count').first()
+    post = Post.objects.order_by('-comment_count').first()
+    urls = {'index': reverse('posts:index')}
+    if group is not None:
+        urls['group'] = reverse('posts:group', kwargs={'slug': group.slug})
+    if author is not None:
+        urls['profile'] = reverse('posts:profile',
+                                  kwargs={'username': author.username})
+    if post is not None:
+        urls['post'] = reverse('posts:post', kwargs={
+            'username': post.author.username, 'post_id': post.pk
+        })
+    if reader is not None:
+        urls['follow_index'] = reverse('posts:follow_index')
+    return urls, reader
+
+
+def measure(client, url, params, warm):
+    if not warm:
+        cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        client.get(url, params)
+        elapsed = time.perf_counter() - started
+    return elapsed, len(queries)
+
+
+@override_settings(CACHES=BENCHMARK_CACHES)
+def run(depths=(1, 10, 100), repeat=20, warm=False, feeds=FEEDS):
+    '''Замеряет ленты на разной глубине страниц.
+
+    Возвращает {лента: {глубина: {p50_ms, p95_ms, queries}}}.
+    Глубина N - страница, до которой дошли N-1 переходами «Следующая».
+    '''
+    urls, reader = feed_urls()
+    client = Client(HTTP_HOST='127.0.0.1')
+    if reader is not None:
+        client.force_login(reader)
+    report = {}
+    for feed in feeds:
+        if feed not in urls:
+            continue
+        url = urls[feed]
+        report[feed] = {}
+        cursor = None
+        page_number = 1
+        for depth in sorted(depths):
+            while page_number < depth:
+                response = client.get(url, {'cursor': cursor or ''})
+                cursor = next_cursor(response)
+                if cursor is None:
+                    break
+                page_number += 1
+            if page_number < depth:
+                break
+            params = {'cursor': cursor} if cursor else {}
+            timings, query_counts = [], []
+            for _ in range(repeat):
+                elapsed, queries = measure(client, url, params, warm)
+                timings.append(elapsed * 1000)
+                query_counts.append(queries)
+            report[feed][depth] = {
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'queries': max(query_counts),
+            }
+    return report
+
+
+def next_cursor(response):
+    '''Курсор из ссылки «Следующая»: контекст шаблона вне тестов пуст.'''
+    match = NEXT_LINK.search(response.content.decode())
+    return match.group(1) if match else None
@@ -0,0 +1,46 @@
+import datetime as dt
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from . import derivatives
+from .models import Post, ThumbnailJob
+from .storage import blob_storage
+from .utils import batched
+
+BATCH_SIZE = 500
+
+
+def delete_derivatives(image_name):
+    prefix = derivatives.prefix_for(image_name)
+    if default_storage.exists(prefix):
+        for filename in default_storage.listdir(prefix)[1]:
+            default_storage.delete(f'{prefix}/{filename}')
+
+
+def collect_garbage(grace=dt.timedelta(hours=24), dry_run=False,
+                    batch_size=BATCH_SIZE):
+    '''Удаляет блобы, на которые не ссылается ни один пост.
+
+    Свежие блобы моложе grace не трогаем: пост с ними может быть ещё
+    не сохранён. Возвращает список удалённых имён.
+    '''
+    threshold = timezone.now() - grace
+    removed = []
+    for batch in batched(blob_storage.blobs(), batch_size):
+        used = set(Post.objects.filter(image__in=batch)
+                   .values_list('image', flat=True))
+        used.update(ThumbnailJob.objects.filter(
+            image__in=batch,
+            status__in=(ThumbnailJob.PENDING, ThumbnailJob.RUNNING)
+        ).values_list('image', flat=True))
+        for name in batch:
+            if name in used:
+                continue
+            if blob_storage.get_modified_time(name) > threshold:
+                continue
+            removed.append(name)
+            if not dry_run:
+                delete_derivatives(name)
+                blob_storage.delete(name)
+    return removed
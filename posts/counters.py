@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+BATCH_SIZE = 500
+
+
+def change_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def change_user_stats(user_id, **deltas):
+    '''Атомарно меняет счётчики профиля.
+
+    Если записи ещё нет, ничего не делает: она будет создана с точными
+    значениями при первом чтении в get_user_stats().
+    '''
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def count_user_stats(user_ids):
+    '''Точные значения счётчиков для пользователей из user_ids.'''
+    posts = dict(Post.objects.filter(author_id__in=user_ids).order_by()
+                 .values('author').annotate(total=Count('pk'))
+                 .values_list('author', 'total'))
+    followers = dict(Follow.objects.filter(author_id__in=user_ids)
+                     .order_by().values('author').annotate(total=Count('pk'))
+                     .values_list('author', 'total'))
+    following = dict(Follow.objects.filter(user_id__in=user_ids)
+                     .order_by().values('user').annotate(total=Count('pk'))
+                     .values_list('user', 'total'))
+    return {
+        user_id: UserStats(user_id=user_id,
+                           posts_count=posts.get(user_id, 0),
+                           followers_count=followers.get(user_id, 0),
+                           following_count=following.get(user_id, 0))
+        for user_id in user_ids
+    }
+
+
+def get_user_stats(user):
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        stats = count_user_stats([user.pk])[user.pk]
+        UserStats.objects.bulk_create([stats], ignore_conflicts=True)
+        return stats
+
+
+def id_batches(queryset, batch_size):
+    '''Id строк queryset пачками по возрастанию.'''
+    last_pk = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).order_by('pk')
+                   .values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def reconcile_user_stats(batch_size=BATCH_SIZE, user_ids=None):
+    '''Пересчитывает счётчики профилей пачками пользователей.
+
+    Без user_ids - всех пользователей. Возвращает число созданных
+    или исправленных записей.
+    '''
+    fields = ('posts_count', 'followers_count', 'following_count')
+    if user_ids is None:
+        batches = id_batches(User.objects.all(), batch_size)
+    else:
+        user_ids = sorted(user_ids)
+        batches = (
+            list(User.objects.filter(
+                pk__in=user_ids[start:start + batch_size]
+            ).values_list('pk', flat=True))
+            for start in range(0, len(user_ids), batch_size)
+        )
+    fixed = 0
+    for user_ids in batches:
+        actual = count_user_stats(user_ids)
+        stored = UserStats.objects.in_bulk(user_ids)
+        changed = [
+            stats for user_id, stats in actual.items()
+            if user_id in stored and any(
+                getattr(stats, field) != getattr(stored[user_id], field)
+                for field in fields
+            )
+        ]
+        missing = [stats for user_id, stats in actual.items()
+                   if user_id not in stored]
+        with transaction.atomic():
+            UserStats.objects.bulk_update(changed, fields)
+            UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+        fixed += len(changed) + len(missing)
+    return fixed
+
+
+def reconcile_comment_counts(batch_size=BATCH_SIZE, posts=None):
+    '''Пересчитывает comment_count пачками id постов.
+
+    posts - queryset постов, по умолчанию все. Возвращает число
+    исправленных постов.
+    '''
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(total=Count('pk')).values('total')
+    actual = Coalesce(Subquery(comments), 0)
+    fixed = 0
+    if posts is None:
+        posts = Post.objects.all()
+    for pks in id_batches(posts, batch_size):
+        with transaction.atomic():
+            fixed += Post.objects.filter(
+                pk__in=pks
+            ).exclude(comment_count=actual).update(comment_count=actual)
+    return fixed
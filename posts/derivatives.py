@@ -0,0 +1,86 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Ширины производных картинок и пропорции карточки поста 960x339
+WIDTHS = (320, 640, 960)
+ASPECT = 339 / 960
+FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+QUALITY = 80
+PREFIX = 'derivatives'
+
+
+def prefix_for(image_name):
+    '''Каталог производных: детерминированно зависит от имени исходника.'''
+    digest = hashlib.sha1(image_name.encode()).hexdigest()
+    return f'{PREFIX}/{digest[:2]}/{digest[2:16]}'
+
+
+def derivative_name(prefix, width, extension):
+    return f'{prefix}/{width}w.{extension}'
+
+
+def srcset(prefix, extension):
+    return ', '.join(
+        f'{default_storage.url(derivative_name(prefix, width, extension))}'
+        f' {width}w'
+        for width in WIDTHS
+    )
+
+
+def store(storage, name, data):
+    '''Записывает файл ровно под именем name.
+
+    storage.save() при занятом имени добавляет к нему суффикс, и два
+    задания для одной картинки оставили бы дубликаты. Файл пишется
+    во временный в том же каталоге и переименовывается os.replace():
+    второе задание просто заменяет файл таким же.
+    '''
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Удалённые хранилища обычно перезаписывают файл сами
+        storage.save(name, ContentFile(data))
+        return
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+        os.chmod(temporary, storage.file_permissions_mode or 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def render(image_name, storage=default_storage):
+    '''Создаёт все производные картинки и возвращает их каталог.
+
+    Уже существующие файлы не пересоздаются, поэтому функцию можно
+    безопасно запускать повторно.
+    '''
+    prefix = prefix_for(image_name)
+    names = {
+        (width, extension): derivative_name(prefix, width, extension)
+        for width in WIDTHS for extension in FORMATS
+    }
+    missing = {key: name for key, name in names.items()
+               if not storage.exists(name)}
+    if not missing:
+        return prefix
+    with storage.open(image_name) as source:
+        image = ImageOps.exif_transpose(Image.open(source)).convert('RGB')
+    for (width, extension), name in missing.items():
+        size = (width, round(width * ASPECT))
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, FORMATS[extension], quality=QUALITY)
+        store(storage, name, buffer.getvalue())
+    return prefix
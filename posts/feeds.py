@@ -0,0 +1,157 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.text import Truncator
+
+from yatube import stampede
+
+from . import versions
+from .models import Group, Post
+
+User = get_user_model()
+
+FEED_TYPES = {'rss': Rss201rev2Feed, 'atom': Atom1Feed}
+FEED_LENGTH = 20
+
+
+class PostsFeed(Feed):
+    '''Последние записи ленты в RSS или Atom.
+
+    Готовый документ хранится в кэше под версией ленты, которая
+    меняется при сохранении и удалении её постов, поэтому документ
+    строится один раз на изменение. Клиенты получают ETag
+    и Last-Modified и при повторном опросе - ответ 304.
+    Подклассы задают kind и version(obj) - версию своей ленты.
+    '''
+    kind = None
+
+    def __init__(self, feed_type):
+        super().__init__()
+        self.feed_type = FEED_TYPES[feed_type]
+        self.type_name = feed_type
+
+    def __call__(self, request, *args, **kwargs):
+        obj = self.get_object(request, *args, **kwargs)
+        # Ссылки в документе абсолютные: хост и схема входят в ключ
+        key = (f'posts:feed:{self.kind}:{obj.pk if obj else ""}:'
+               f'{self.type_name}:{request.scheme}:{request.get_host()}:'
+               f'{self.version(obj)}')
+
+        # Новая версия ленты - новый ключ: его пересчитывает один запрос
+        entry = stampede.get_or_compute(
+            key, lambda: self.render(obj, request),
+            settings.FEED_CACHE_TIMEOUT
+        )
+        last_modified = entry['last_modified']
+        response = get_conditional_response(
+            request,
+            etag=entry['etag'],
+            last_modified=last_modified and parse_http_date_safe(
+                last_modified
+            ),
+        )
+        if response is None:
+            response = HttpResponse(entry['content'],
+                                    content_type=entry['content_type'])
+        response['ETag'] = entry['etag']
+        if last_modified:
+            response['Last-Modified'] = last_modified
+        return response
+
+    def render(self, obj, request):
+        '''Документ ленты для кэша, как его строит Feed.__call__.
+
+        Объект ленты уже найден в __call__, второй раз его не ищем.
+        '''
+        feedgen = self.get_feed(obj, request)
+        content = feedgen.writeString('utf-8').encode()
+        latest = feedgen.latest_post_date()
+        return {
+            'content': content,
+            'content_type': feedgen.content_type,
+            'etag': f'"{hashlib.md5(content).hexdigest()}"',
+            'last_modified': http_date(timegm(latest.utctimetuple())),
+        }
+
+    def item_title(self, post):
+        return Truncator(' '.join(post.text.split())).chars(80)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post', args=[post.author.username, post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.username
+
+
+class IndexFeed(PostsFeed):
+    kind = 'index'
+    title = 'Yatube: последние записи'
+    description = 'Последние обновления на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return Post.objects.for_feed()[:FEED_LENGTH]
+
+    def version(self, obj):
+        return versions.index_version()
+
+
+class GroupFeed(PostsFeed):
+    kind = 'group'
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group', args=[group.slug])
+
+    def items(self, group):
+        return group.posts.for_feed()[:FEED_LENGTH]
+
+    def version(self, group):
+        return versions.group_version(group.pk)
+
+
+class AuthorFeed(PostsFeed):
+    kind = 'author'
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: записи {author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.get_full_name() or author}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def items(self, author):
+        return author.posts.for_feed()[:FEED_LENGTH]
+
+    def version(self, author):
+        return versions.profile_version(author.pk)
@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Comment, Post
+from .uploadhandlers import check_dimensions
 
 
 class PostForm(forms.ModelForm):
@@ -12,6 +13,22 @@ class PostForm(forms.ModelForm):
                           {'required':
                            'Пожалуйста, введите текст Вашей публикации'}}
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean_image(self):
+        '''Ошибки обработчика загрузки и проверка размера по заголовку.'''
+        if 'image' in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors['image'])
+        image = self.cleaned_data.get('image')
+        header = getattr(image, 'image', None)
+        if header is not None:
+            error = check_dimensions(header.size)
+            if error:
+                raise forms.ValidationError(error)
+        return image
+
 
 class CommentForm(forms.ModelForm):
 
@@ -0,0 +1,305 @@
+import bisect
+import gzip
+import io
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Max
+
+from . import counters, timeline, versions
+from .models import Comment, Follow, Group, Post, User
+from .seeding import manual_dates
+
+BATCH_SIZE = 1000
+READ_SIZE = 1024 * 1024
+# Запись длиннее этого считаем битой, а не читаем файл в память целиком
+MAX_RECORD_SIZE = 64 * 1024 * 1024
+# Порядок важен: модели идут после тех, на кого ссылаются
+MODELS = {
+    'auth.user': User,
+    'posts.group': Group,
+    'posts.post': Post,
+    'posts.comment': Comment,
+    'posts.follow': Follow,
+}
+# Уже существующие пользователи и группы не создаются заново,
+# ссылки на них из дампа ведут на найденные по этим полям строки.
+NATURAL_KEYS = {'auth.user': 'username', 'posts.group': 'slug'}
+IGNORE_CONFLICTS = {'posts.follow'}
+SEPARATORS = re.compile(r'[\s,\[\]]*')
+
+
+class DumpError(Exception):
+    pass
+
+
+@contextmanager
+def open_dump(path):
+    '''Текстовый поток дампа: файл, .gz или stdin для "-".'''
+    if path == '-':
+        yield io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        return
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as stream:
+        yield stream
+
+
+def iter_records(stream):
+    '''Записи из JSON-массива (как у dumpdata) или JSONL по одной.
+
+    Файл читается кусками, в памяти - только текущий кусок. Скобки
+    массива, запятые и переводы строк между записями пропускаются,
+    поэтому оба формата разбираются одним циклом.
+    '''
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+    while True:
+        pos = SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer):
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if len(buffer) - pos > MAX_RECORD_SIZE:
+                    raise DumpError('Не удалось разобрать запись дампа')
+            else:
+                if not isinstance(record, dict):
+                    raise DumpError(f'Ожидался объект, а не {record!r}')
+                yield record
+                continue
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            if pos < len(buffer):
+                raise DumpError('Дамп обрывается на середине записи')
+            return
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+class IdMap:
+    '''Соответствие id из дампа новым id.
+
+    Хранится отрезками подряд идущих id, поэтому дамп с плотными
+    первичными ключами занимает в памяти несколько отрезков, а не
+    словарь на миллионы элементов.
+    '''
+
+    def __init__(self):
+        self.starts = []
+        self.runs = []
+
+    def get(self, old):
+        index = bisect.bisect_right(self.starts, old) - 1
+        if index >= 0:
+            start, new_start, length = self.runs[index]
+            if old < start + length:
+                return new_start + old - start
+        return None
+
+    def add(self, old, new):
+        if self.runs:
+            start, new_start, length = self.runs[-1]
+            if old == start + length and new == new_start + length:
+                self.runs[-1][2] += 1
+                return
+        index = bisect.bisect_right(self.starts, old)
+        self.starts.insert(index, old)
+        self.runs.insert(index, [old, new, 1])
+
+    def __len__(self):
+        return sum(length for _, _, length in self.runs)
+
+
+class Importer:
+    '''Загружает записи пачками через bulk_create.
+
+    Новым строкам достаётся id из дампа со сдвигом на максимальный id
+    таблицы на момент начала загрузки, в пустую базу id переносятся
+    как есть. Запись, чей внешний ключ ещё не встречался, откладывается
+    до конца загрузки. Пока идёт загрузка, в те же таблицы писать нельзя.
+    '''
+
+    def __init__(self, batch_size=BATCH_SIZE, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.buffers = defaultdict(list)
+        self.deferred = defaultdict(list)
+        self.id_maps = {label: IdMap() for label in MODELS}
+        self.offsets = {}
+        self.imported = defaultdict(int)
+        self.matched = defaultdict(int)
+        self.skipped = 0
+        self.feeds = defaultdict(set)
+        self.followers = set()
+        self.followed = set()
+        self.started = time.monotonic()
+
+    def load(self, records):
+        for record in records:
+            self.add(record)
+        self.finish()
+        return self.report()
+
+    def add(self, record):
+        label = record.get('model')
+        if (label not in MODELS or not isinstance(record.get('pk'), int)
+                or not isinstance(record.get('fields'), dict)):
+            self.skipped += 1
+            return
+        buffer = self.buffers[label]
+        buffer.append(record)
+        if len(buffer) >= self.batch_size:
+            self.flush(label)
+
+    def finish(self):
+        for label in MODELS:
+            self.flush(label)
+        for label in MODELS:
+            self.buffers[label], self.deferred[label] = (
+                self.deferred[label], []
+            )
+            self.flush(label)
+        self.skipped += sum(len(records) for records in
+                            self.deferred.values())
+        self.deferred.clear()
+        # bulk_create не отправляет сигналы: ленты, счётчики и версии
+        # кэша приводим в порядок сами, только для затронутых строк.
+        timeline.rebuild(sorted(self.timeline_users()))
+        if 'posts.post' in self.offsets:
+            # Комментарии из дампа ссылаются только на посты из дампа,
+            # а у тех id больше сдвига
+            counters.reconcile_comment_counts(
+                self.batch_size,
+                Post.objects.filter(pk__gt=self.offsets['posts.post']),
+            )
+        counters.reconcile_user_stats(
+            self.batch_size, set(self.feeds) | self.followers | self.followed
+        )
+        versions.bump_feeds(self.feeds)
+        for user_id in self.followers:
+            versions.bump_follow_feed(user_id)
+
+    def timeline_users(self):
+        '''Новые подписчики и подписчики авторов новых постов.'''
+        users = set(self.followers)
+        authors = sorted(self.feeds)
+        for start in range(0, len(authors), self.batch_size):
+            users.update(Follow.objects.filter(
+                author_id__in=authors[start:start + self.batch_size]
+            ).values_list('user_id', flat=True))
+        return users
+
+    def parents(self, label):
+        return [
+            field.related_model._meta.label_lower
+            for field in MODELS[label]._meta.concrete_fields
+            if field.is_relation
+            and field.related_model._meta.label_lower in MODELS
+        ]
+
+    def flush(self, label):
+        for parent in self.parents(label):
+            if self.buffers[parent]:
+                self.flush(parent)
+        records, self.buffers[label] = self.buffers[label], []
+        if not records:
+            return
+        model = MODELS[label]
+        id_map = self.id_maps[label]
+        offset = self.offset(label)
+        existing = self.match_existing(label, records)
+        objects = []
+        for record in records:
+            old_pk = record['pk']
+            if id_map.get(old_pk) is not None:
+                self.skipped += 1
+            elif old_pk in existing:
+                id_map.add(old_pk, existing[old_pk])
+                self.matched[label] += 1
+            else:
+                obj = self.build(model, record['fields'])
+                if obj is None:
+                    self.deferred[label].append(record)
+                    continue
+                obj.pk = old_pk + offset
+                id_map.add(old_pk, obj.pk)
+                objects.append(obj)
+        dates = [field for field in model._meta.concrete_fields
+                 if getattr(field, 'auto_now_add', False)]
+        with transaction.atomic(), manual_dates(*dates):
+            model.objects.bulk_create(
+                objects, batch_size=self.batch_size,
+                ignore_conflicts=label in IGNORE_CONFLICTS
+            )
+        self.remember_feeds(label, objects)
+        self.imported[label] += len(objects)
+        if self.progress is not None:
+            self.progress(label, self.imported[label], self.rate())
+
+    def offset(self, label):
+        if label not in self.offsets:
+            self.offsets[label] = MODELS[label].objects.aggregate(
+                last=Max('pk')
+            )['last'] or 0
+        return self.offsets[label]
+
+    def match_existing(self, label, records):
+        '''{id из дампа: id в базе} для уже существующих строк.'''
+        if label not in NATURAL_KEYS:
+            return {}
+        key = NATURAL_KEYS[label]
+        by_key = {record['fields'].get(key): record['pk']
+                  for record in records}
+        found = MODELS[label].objects.filter(
+            **{f'{key}__in': by_key}
+        ).values_list(key, 'pk')
+        return {by_key[value]: pk for value, pk in found}
+
+    def build(self, model, fields):
+        '''Объект модели или None, если ссылка ещё не разрешается.'''
+        obj = model()
+        for name, value in fields.items():
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_many or not field.concrete:
+                continue
+            if field.is_relation and value is not None:
+                target = field.related_model._meta.label_lower
+                if target not in self.id_maps:
+                    continue
+                value = self.id_maps[target].get(value)
+                if value is None:
+                    return None
+            elif not field.is_relation:
+                value = field.to_python(value)
+            setattr(obj, field.attname, value)
+        return obj
+
+    def remember_feeds(self, label, objects):
+        if label == 'posts.post':
+            for post in objects:
+                self.feeds[post.author_id].add(post.group_id)
+        elif label == 'posts.follow':
+            self.followers.update(follow.user_id for follow in objects)
+            self.followed.update(follow.author_id for follow in objects)
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        total = sum(self.imported.values())
+        return total / elapsed if elapsed else 0
+
+    def report(self):
+        return {
+            'imported': dict(self.imported),
+            'matched': dict(self.matched),
+            'skipped': self.skipped,
+            'seconds': round(time.monotonic() - self.started, 2),
+            'rows_per_second': round(self.rate()),
+        }
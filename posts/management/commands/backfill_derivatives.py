@@ -0,0 +1,63 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import derivatives, versions
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт производные картинок постов в нескольких процессах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Число процессов, по умолчанию - по ядрам')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--all', action='store_true',
+                            help='Проверить и посты с готовыми миниатюрами')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            posts = posts.filter(thumbnail='')
+        done = failed = 0
+        last_pk = 0
+        # Закэшированные ленты показывают заглушку вместо картинки
+        feeds = defaultdict(set)
+        # Дочерние процессы работают только с файлами, соединения с БД
+        # закрываем, чтобы они не унаследовали открытые дескрипторы.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['processes'],
+                                 initializer=django.setup) as pool:
+            while True:
+                batch = list(posts.filter(pk__gt=last_pk).order_by('pk')
+                             .values_list('pk', 'image', 'author_id',
+                                          'group_id')
+                             [:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                futures = [
+                    (pk, image, author_id, group_id,
+                     pool.submit(derivatives.render, image))
+                    for pk, image, author_id, group_id in batch
+                ]
+                for pk, image, author_id, group_id, future in futures:
+                    try:
+                        prefix = future.result()
+                    except Exception as error:
+                        failed += 1
+                        self.stderr.write(f'{image}: {error}')
+                        continue
+                    if Post.objects.filter(pk=pk, image=image).update(
+                        thumbnail=prefix
+                    ):
+                        feeds[author_id].add(group_id)
+                    done += 1
+        versions.bump_feeds(feeds)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, ошибок: {failed}'
+        ))
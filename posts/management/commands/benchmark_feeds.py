@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время и число запросов лент, выводит JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depth', type=int, action='append',
+                            dest='depths',
+                            help=('Номер страницы ленты, '
+                                  'по умолчанию 1, 10, 100'))
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--feed', action='append', dest='feeds',
+                            choices=benchmark.FEEDS)
+        parser.add_argument('--warm', action='store_true',
+                            help='Не очищать кэш перед каждым запросом')
+        parser.add_argument('--output', help='Файл для JSON-отчёта')
+
+    def handle(self, *args, **options):
+        report = benchmark.run(
+            depths=options['depths'] or (1, 10, 100),
+            repeat=options['repeat'],
+            warm=options['warm'],
+            feeds=options['feeds'] or benchmark.FEEDS,
+        )
+        content = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(content)
+        self.stdout.write(content)
@@ -0,0 +1,34 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube.sqlite import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает стандартный SQLite и настройки из DATABASES '
+            'при параллельных чтении и записи, выводит JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Секунд на каждый режим')
+        parser.add_argument('--rows', type=int, default=10000,
+                            help='Постов в тестовой базе')
+        parser.add_argument('--output', help='Файл для JSON-отчёта')
+
+    def handle(self, *args, **options):
+        report = benchmark.run(
+            settings.DATABASES['default'].get('OPTIONS', {}),
+            readers=options['readers'],
+            writers=options['writers'],
+            duration=options['duration'],
+            rows=options['rows'],
+        )
+        content = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(content)
+        self.stdout.write(content)
@@ -0,0 +1,26 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand
+
+from posts import blobs
+
+
+class Command(BaseCommand):
+    help = 'Удаляет картинки, на которые больше не ссылаются посты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Не трогать файлы моложе этого срока')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        removed = blobs.collect_garbage(
+            grace=dt.timedelta(hours=options['grace_hours']),
+            dry_run=options['dry_run']
+        )
+        for name in removed:
+            self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {len(removed)}'
+        ))
@@ -0,0 +1,19 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from yatube.metrics import registry
+
+
+class Command(BaseCommand):
+    help = 'Выводит накопленные гистограммы метрик запросов в JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Обнулить метрики после вывода')
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(registry.snapshot(), indent=2,
+                                     ensure_ascii=False))
+        if options['reset']:
+            registry.reset()
@@ -0,0 +1,63 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts import exporting
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии и подписки '
+            'в JSONL, при --watermark - только новое с прошлого запуска')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл выгрузки, .gz или "-"')
+        parser.add_argument('--model', action='append',
+                            choices=list(exporting.MODELS), dest='models',
+                            help='Выгрузить только эту модель')
+        parser.add_argument('--since',
+                            help='Дата или дата и время начала выгрузки; '
+                                 'если отметка новее, выгрузка идёт от неё')
+        parser.add_argument('--watermark',
+                            help='Файл с отметкой прошлой выгрузки')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--settle', type=int,
+                            default=exporting.SETTLE_SECONDS,
+                            help='Не выгружать строки моложе, секунд')
+        parser.add_argument('--chunk-size', type=int,
+                            default=exporting.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options['since'])
+        watermark = exporting.read_watermark(options['watermark'])
+        with exporting.open_output(options['output'],
+                                   options['gzip']) as stream:
+            counts, watermark = exporting.export(
+                stream,
+                labels=options['models'],
+                since=since,
+                watermark=watermark,
+                settle=options['settle'],
+                chunk_size=options['chunk_size'],
+            )
+        # Отметку двигаем только после того, как выгрузка записана.
+        if options['watermark']:
+            exporting.write_watermark(options['watermark'], watermark)
+        # Данные могут идти в stdout, отчёт пишем отдельно
+        report = self.stderr if options['output'] == '-' else self.stdout
+        for label, total in counts.items():
+            report.write(f'{label}: {total}')
+
+    def parse_since(self, value):
+        if value is None:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                raise CommandError(f'Не удалось разобрать дату {value}')
+            since = dt.datetime.combine(date, dt.time())
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importing
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает дамп пользователей, групп, постов, '
+            'комментариев и подписок (JSON как у dumpdata или JSONL)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл дампа, .gz или "-" для stdin')
+        parser.add_argument('--batch-size', type=int,
+                            default=importing.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным')
+        importer = importing.Importer(options['batch_size'],
+                                      progress=self.report_progress)
+        try:
+            with importing.open_dump(options['path']) as stream:
+                report = importer.load(importing.iter_records(stream))
+        except (OSError, importing.DumpError) as error:
+            raise CommandError(error)
+        for label, total in report['imported'].items():
+            matched = report['matched'].get(label, 0)
+            self.stdout.write(f'{label}: {total}, найдено в базе: {matched}')
+        self.stdout.write(f'Пропущено записей: {report["skipped"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {report["seconds"]} с, '
+            f'{report["rows_per_second"]} строк/с'
+        ))
+
+    def report_progress(self, label, total, rate):
+        self.stdout.write(f'{label}: {total} ({rate:.0f} строк/с)')
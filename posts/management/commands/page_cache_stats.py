@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import pagecache
+
+
+class Command(BaseCommand):
+    help = 'Выводит попадания и промахи кэша страниц в JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Обнулить счётчики после вывода')
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(pagecache.stats(), indent=2))
+        if options['reset']:
+            pagecache.reset_stats()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задания на миниатюры, оставшиеся в очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Сколько заданий выполнить')
+        parser.add_argument('--requeue-running', action='store_true',
+                            help='Вернуть в очередь зависшие задания')
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            requeued = thumbnails.requeue_running()
+            self.stdout.write(f'Возвращено в очередь: {requeued}')
+        done = thumbnails.process_pending(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюр создано: {done}'
+        ))
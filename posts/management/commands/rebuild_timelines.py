@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя, ленту которого нужно пересобрать'
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = timeline.rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Подписок обработано: {rebuilt}'
+        ))
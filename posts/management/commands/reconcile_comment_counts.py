@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает число комментариев у постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=counters.BATCH_SIZE,
+            help='Сколько постов пересчитывать за одну транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile_comment_counts(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено постов: {fixed}'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики записей и подписок в профилях'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=counters.BATCH_SIZE,
+            help='Сколько пользователей пересчитывать за одну транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile_user_stats(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено профилей: {fixed}'
+        ))
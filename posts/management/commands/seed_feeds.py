@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = 'Заполняет БД синтетическими данными для замеров лент'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--follows', type=int, default=50,
+                            help='Сколько подписок выбрать каждому')
+        parser.add_argument('--alpha', type=float, default=1.1,
+                            help='Показатель степенного распределения')
+        parser.add_argument('--batch-size', type=int,
+                            default=seeding.BATCH_SIZE)
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Зерно генератора случайных чисел')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        created = seeding.seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            alpha=options['alpha'],
+            batch_size=options['batch_size'],
+            random_seed=options['seed'],
+        )
+        for name, total in created.items():
+            self.stdout.write(f'{name}: {total}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
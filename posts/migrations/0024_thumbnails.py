@@ -0,0 +1,40 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Миниатюра'),
+        ),
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=255, verbose_name='Картинка')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thumbnail_jobs', to='posts.Post', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'Задание на миниатюру',
+                'verbose_name_plural': 'Задания на миниатюры',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='thumbnailjob',
+            index=models.Index(fields=['status', 'created'], name='thumbnail_job_status_idx'),
+        ),
+    ]
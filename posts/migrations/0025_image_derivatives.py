@@ -0,0 +1,26 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:58
+
+from django.db import migrations, models
+
+
+def reset_thumbnails(apps, schema_editor):
+    # Старые значения - имена миниатюр sorl, а не каталоги производных.
+    # Их пересоздаёт команда backfill_derivatives.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.exclude(thumbnail='').update(thumbnail='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Каталог миниатюр'),
+        ),
+        migrations.RunPython(reset_thumbnails, migrations.RunPython.noop),
+    ]
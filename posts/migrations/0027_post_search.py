@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# Внешний контент: индекс хранит только токены, текст берётся из posts_post.
+# Триггеры держат индекс в согласии с таблицей при любых изменениях,
+# включая bulk_create и QuerySet.update.
+CREATE_SQL = [
+    '''CREATE VIRTUAL TABLE posts_post_search USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''',
+    '''CREATE TRIGGER posts_post_search_ai AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_search(rowid, text) VALUES (new.id, new.text);
+    END''',
+    '''CREATE TRIGGER posts_post_search_ad AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_search(posts_post_search, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END''',
+    '''CREATE TRIGGER posts_post_search_au AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(posts_post_search, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO posts_post_search(rowid, text) VALUES (new.id, new.text);
+    END''',
+    "INSERT INTO posts_post_search(posts_post_search) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_post_search_ai',
+    'DROP TRIGGER IF EXISTS posts_post_search_ad',
+    'DROP TRIGGER IF EXISTS posts_post_search_au',
+    'DROP TABLE IF EXISTS posts_post_search',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
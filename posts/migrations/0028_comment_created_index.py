@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_post_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата комментария'),
+        ),
+    ]
@@ -1,9 +1,19 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import models
 
+from . import derivatives
+from .storage import blob_storage
+
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        '''Посты для ленты: автор и группа одним запросом.'''
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст публикации',
                             help_text='Введите текст публикации')
@@ -23,17 +33,68 @@ class Post(models.Model):
     image = models.ImageField(
         blank=True,
         null=True,
+        db_index=True,
+        storage=blob_storage,
         verbose_name='Картинка'
     )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+    thumbnail = models.CharField(
+        'Каталог миниатюр',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    # Эти поля меняются только через update(): счётчик - F()-выражением,
+    # миниатюра - фоновым воркером. save() загруженного поста их
+    # не перезаписывает.
+    managed_fields = ('comment_count', 'thumbnail')
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def thumbnail_url(self):
+        if not self.thumbnail:
+            return ''
+        return default_storage.url(derivatives.derivative_name(
+            self.thumbnail, derivatives.WIDTHS[-1], 'jpg'
+        ))
+
+    @property
+    def webp_srcset(self):
+        return derivatives.srcset(self.thumbnail, 'webp')
+
+    @property
+    def jpeg_srcset(self):
+        return derivatives.srcset(self.thumbnail, 'jpg')
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.managed_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 class Group(models.Model):
     title = models.CharField('Сообщество', max_length=200, unique=True)
@@ -66,12 +127,17 @@ class Comment(models.Model):
         verbose_name='Текст комментария',
         help_text='Введите комментарий'
     )
-    created = models.DateTimeField('Дата комментария', auto_now_add=True)
+    created = models.DateTimeField('Дата комментария', auto_now_add=True,
+                                   db_index=True)
 
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -92,3 +158,93 @@ class Follow(models.Model):
         constraints = [models.UniqueConstraint(
             fields=['user', 'author'], name='unique_object'
         )]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    '''Запись ленты подписок: пост автора, на которого подписан user.'''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'], name='unique_timeline_entry'
+        )]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    '''Счётчики профиля, чтобы не считать их COUNT(*) на каждый запрос.'''
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписан', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+
+class ThumbnailJob(models.Model):
+    '''Задание фоновому воркеру на миниатюру картинки поста.'''
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnail_jobs',
+        verbose_name='Публикация'
+    )
+    image = models.CharField('Картинка', max_length=255)
+    status = models.CharField('Статус', max_length=10,
+                              choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Задание на миниатюру'
+        verbose_name_plural = 'Задания на миниатюры'
+        indexes = [
+            models.Index(fields=['status', 'created'],
+                         name='thumbnail_job_status_idx'),
+        ]
@@ -0,0 +1,123 @@
+import logging
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
+from django.db.models import Count, F
+
+from . import counters, versions
+from .models import Comment, Post
+
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def chunked_ids(queryset, batch_size=BATCH_SIZE):
+    '''Id строк queryset пачками по возрастанию, без загрузки объектов.'''
+    last_pk = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).order_by('pk')
+                   .values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def raw_delete(queryset):
+    '''DELETE одним запросом, без сигналов и загрузки объектов.
+
+    Зависимые строки с on_delete=CASCADE удаляются так же, на один
+    уровень вглубь: у зависимостей постов своих зависимостей нет.
+    '''
+    model = queryset.model
+    pks = queryset.values_list('pk', flat=True)
+    for relation in model._meta.related_objects:
+        if relation.on_delete is models.CASCADE:
+            relation.related_model._base_manager.filter(**{
+                f'{relation.field.name}__in': pks
+            })._raw_delete(queryset.db)
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_posts(queryset, batch_size=BATCH_SIZE):
+    '''Удаляет посты пачками, каждая пачка - своя транзакция.
+
+    Счётчики профилей меняются одним UPDATE на автора в пачке,
+    кэш лент сбрасывается один раз в конце. Возвращает число
+    удалённых постов.
+    '''
+    deleted = 0
+    feeds = defaultdict(set)
+    for pks in chunked_ids(queryset, batch_size):
+        posts = Post.objects.filter(pk__in=pks)
+        rows = list(posts.values_list('author_id', 'group_id'))
+        with transaction.atomic():
+            raw_delete(Comment.objects.filter(post_id__in=pks))
+            raw_delete(posts)
+            authors = Counter(author_id for author_id, _ in rows)
+            for author_id, total in authors.items():
+                counters.change_user_stats(author_id, posts_count=-total)
+        for author_id, group_id in rows:
+            feeds[author_id].add(group_id)
+        deleted += len(pks)
+        logger.info('Deleted %s posts', deleted)
+    versions.bump_feeds(feeds)
+    return deleted
+
+
+def delete_comments(queryset, batch_size=BATCH_SIZE):
+    '''Удаляет комментарии пачками и поправляет comment_count постов.'''
+    deleted = 0
+    post_ids = set()
+    for pks in chunked_ids(queryset, batch_size):
+        comments = Comment.objects.filter(pk__in=pks)
+        per_post = comments.order_by().values('post').annotate(
+            total=Count('pk')
+        ).values_list('post', 'total')
+        with transaction.atomic():
+            for post_id, total in per_post:
+                Post.objects.filter(pk=post_id).update(
+                    comment_count=F('comment_count') - total
+                )
+                post_ids.add(post_id)
+            raw_delete(comments)
+        deleted += len(pks)
+        logger.info('Deleted %s comments', deleted)
+    feeds = defaultdict(set)
+    for author_id, group_id in Post.objects.filter(
+            pk__in=post_ids).values_list('author_id', 'group_id').iterator():
+        feeds[author_id].add(group_id)
+    versions.bump_feeds(feeds)
+    return deleted
+
+
+def move_posts(queryset, group, batch_size=BATCH_SIZE):
+    '''Переносит посты в группу group (None - убрать из групп).'''
+    moved = 0
+    group_id = group.pk if group is not None else None
+    feeds = defaultdict(lambda: {group_id})
+    for pks in chunked_ids(queryset, batch_size):
+        posts = Post.objects.filter(pk__in=pks)
+        rows = list(posts.values_list('author_id', 'group_id'))
+        posts.update(group_id=group_id)
+        for author_id, previous_group_id in rows:
+            feeds[author_id].add(previous_group_id)
+        moved += len(pks)
+        logger.info('Moved %s posts', moved)
+    versions.bump_feeds(feeds)
+    return moved
+
+
+def purge_authors(users, batch_size=BATCH_SIZE):
+    '''Удаляет все посты и комментарии авторов. Аккаунты остаются.
+
+    Возвращает (число постов, число комментариев).
+    '''
+    user_ids = users.values_list('pk', flat=True)
+    comments = delete_comments(
+        Comment.objects.filter(author_id__in=user_ids), batch_size
+    )
+    posts = delete_posts(Post.objects.filter(author_id__in=user_ids),
+                         batch_size)
+    return posts, comments
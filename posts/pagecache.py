@@ -0,0 +1,154 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.http import HttpResponse
+
+from . import versions
+from .models import Group, Post
+
+User = get_user_model()
+
+KEY_PREFIX = 'posts:page'
+COUNTER_KEYS = {
+    'hit': 'posts:page_stats:hits',
+    'miss': 'posts:page_stats:misses',
+}
+
+
+def page_key(name, version, request):
+    url = f'{request.get_host()}{request.get_full_path()}'
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return f'{KEY_PREFIX}:{name}:{version}:{digest}'
+
+
+def stats_cache():
+    '''Кэш счётчиков: общий для воркеров и команды page_cache_stats.'''
+    return caches[settings.PAGE_CACHE_STATS_CACHE]
+
+
+# Счётчики копятся в процессе и сливаются в общий кэш раз
+# в PAGE_CACHE_STATS_FLUSH_INTERVAL секунд, как метрики запросов:
+# incr() под блокировкой на каждый запрос дороже самой страницы из кэша.
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def count(outcome):
+    with _lock:
+        _pending[outcome] += 1
+        due = (time.monotonic() - _last_flush
+               >= settings.PAGE_CACHE_STATS_FLUSH_INTERVAL)
+    if due:
+        flush()
+
+
+def flush():
+    '''Сливает счётчики процесса в общий кэш.'''
+    global _pending, _last_flush
+    with _lock:
+        pending, _pending = _pending, Counter()
+        _last_flush = time.monotonic()
+    counters = stats_cache()
+    for outcome, delta in pending.items():
+        key = COUNTER_KEYS[outcome]
+        try:
+            counters.incr(key, delta)
+        except ValueError:
+            if not counters.add(key, delta, None):
+                counters.incr(key, delta)
+
+
+def stats():
+    '''Счётчики попаданий и промахов для мониторинга.'''
+    flush()
+    stored = stats_cache().get_many(list(COUNTER_KEYS.values()))
+    hits = stored.get(COUNTER_KEYS['hit'], 0)
+    misses = stored.get(COUNTER_KEYS['miss'], 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses,
+            'hit_ratio': round(hits / total, 3) if total else 0}
+
+
+def reset_stats():
+    with _lock:
+        _pending.clear()
+    stats_cache().delete_many(list(COUNTER_KEYS.values()))
+
+
+def cacheable(request, response):
+    # Страница с CSRF-токеном или cookie личная, её не кэшируем
+    return (response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED'))
+
+
+def cache_anonymous(version_for):
+    '''Кэширует страницу целиком для анонимных GET-запросов.
+
+    Ключ - путь с параметрами и версия ленты из version_for(**kwargs).
+    Версии меняют сигналы при изменении постов, комментариев
+    и подписок, поэтому сбрасываются только затронутые страницы.
+    Если version_for вернула None (объекта нет), view вызывается как
+    обычно, и 404 отдаёт она.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            version = version_for(**kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+            key = page_key(view.__name__, version, request)
+            entry = cache.get(key)
+            if entry is not None:
+                count('hit')
+                response = HttpResponse(entry['content'],
+                                        content_type=entry['content_type'])
+                response['X-Page-Cache'] = 'hit'
+                return response
+            count('miss')
+            response = view(request, *args, **kwargs)
+            if cacheable(request, response):
+                cache.set(key, {'content': response.content,
+                                'content_type': response['Content-Type']},
+                          settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
+
+def author_version(username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    return author_id and versions.profile_version(author_id)
+
+
+def index_version():
+    return versions.index_version()
+
+
+def group_version(slug):
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+    return group_id and versions.group_version(group_id)
+
+
+def post_version(username, post_id):
+    # Комментарии и правки поста меняют версию профиля автора
+    author_id = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).values_list('author_id', flat=True).first()
+    return author_id and versions.profile_version(author_id)
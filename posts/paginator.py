@@ -0,0 +1,164 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, pub_date, pk):
+    raw = f'{direction}|{pub_date.isoformat()}|{pk}'
+    token = base64.urlsafe_b64encode(raw.encode())
+    return token.decode().rstrip('=')
+
+
+def decode_cursor(token):
+    '''Возвращает (направление, pub_date, id) из непрозрачного курсора.'''
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError) as error:
+        raise InvalidCursor(token) from error
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        raise InvalidCursor(token)
+    return direction, pub_date, pk
+
+
+class KeysetPaginator(Paginator):
+    '''Постраничный вывод по ключу (pub_date, id).
+
+    Каждая страница - один диапазонный запрос по индексу без COUNT(*)
+    и OFFSET. Вместо номера страницы используются курсоры next_cursor
+    и previous_cursor, которые отдаются вместе со страницей.
+    По умолчанию ключ - поля pub_date и id, другие можно передать в keys.
+    '''
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id')):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+
+    def get_page(self, cursor):
+        '''Обычная Page по курсору, строки читаются сразу.'''
+        lazy = self.get_lazy_page(cursor)
+        page = Page(lazy.object_list, lazy.number, self)
+        # Этого достаточно, чтобы has_previous/has_next у Page работали
+        self.num_pages = page.number + 1 if lazy.has_next() else page.number
+        page.cursor = lazy.cursor
+        page.next_cursor = lazy.next_cursor
+        page.previous_cursor = lazy.previous_cursor
+        return page
+
+    def get_lazy_page(self, cursor):
+        '''Страница по курсору, которая читает строки при обращении.'''
+        try:
+            direction, pub_date, pk = decode_cursor(cursor or '')
+        except InvalidCursor:
+            cursor, direction, pub_date, pk = '', NEXT, None, None
+        return KeysetPage(self, cursor,
+                          lambda: self.fetch(direction, pub_date, pk))
+
+    def fetch(self, direction, pub_date, pk):
+        '''Строки страницы и признаки предыдущей и следующей страниц.'''
+        date_key, id_key = self.keys
+        queryset = self.object_list
+        if direction == NEXT:
+            queryset = queryset.order_by(f'-{date_key}', f'-{id_key}')
+            if pk is not None:
+                queryset = queryset.filter(
+                    Q(**{f'{date_key}__lt': pub_date})
+                    | Q(**{date_key: pub_date, f'{id_key}__lt': pk})
+                )
+        else:
+            queryset = queryset.order_by(date_key, id_key).filter(
+                Q(**{f'{date_key}__gt': pub_date})
+                | Q(**{date_key: pub_date, f'{id_key}__gt': pk})
+            )
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == NEXT:
+            return rows, pk is not None, has_more
+        rows.reverse()
+        return rows, has_more, True
+
+    def cursor_for(self, direction, obj):
+        date_key, id_key = self.keys
+        return encode_cursor(direction, getattr(obj, date_key),
+                             getattr(obj, id_key))
+
+
+class KeysetPage(Page):
+    '''Страница KeysetPaginator, которая читает строки при обращении.
+
+    Курсор страницы известен до запроса, и по нему фрагмент ищется
+    в кэше: если фрагмент там есть, запрос ленты не выполняется.
+    Лента подписок и API берут обычную Page из get_page().
+    '''
+
+    def __init__(self, paginator, cursor, fetch):
+        self.paginator = paginator
+        self.cursor = cursor
+        self._fetch = fetch
+
+    @cached_property
+    def _fetched(self):
+        return self._fetch()
+
+    @cached_property
+    def object_list(self):
+        return self._fetched[0]
+
+    @property
+    def number(self):
+        # Номер страницы относительный: 1 - первая, 2 - любая другая
+        return 2 if self.has_previous() else 1
+
+    def has_previous(self):
+        return self._fetched[1]
+
+    def has_next(self):
+        return self._fetched[2]
+
+    @cached_property
+    def next_cursor(self):
+        rows = self._fetched[0]
+        if rows and self.has_next():
+            return self.paginator.cursor_for(NEXT, rows[-1])
+        return None
+
+    @cached_property
+    def previous_cursor(self):
+        rows = self._fetched[0]
+        if rows and self.has_previous():
+            return self.paginator.cursor_for(PREVIOUS, rows[0])
+        return None
+
+    def __repr__(self):
+        return f'<Page {self.cursor or "first"}>'
+
+
+class CappedCountPaginator(Paginator):
+    '''Постраничный вывод с ограниченным подсчётом строк.
+
+    Вместо полного COUNT(*) считает не больше count_limit строк
+    подзапросом с LIMIT, поэтому стоимость подсчёта не растёт вместе
+    с таблицей. Страницы дальше лимита недоступны, до них добираются
+    фильтрами и поиском.
+    '''
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.count_limit].count()
@@ -0,0 +1,96 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+TABLE = 'posts_post_search'
+# Метки подсветки: управляющие символы не встречаются в тексте постов,
+# поэтому их можно заменить на теги уже после экранирования.
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 16
+TERM_RE = re.compile(r'\w+')
+
+
+def supported():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    '''Превращает пользовательский ввод в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки, поэтому операторы и спецсимволы
+    FTS5 из ввода не работают. Последнее слово ищется как префикс.
+    '''
+    terms = TERM_RE.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(MARK_START, '<mark>')
+                       .replace(MARK_END, '</mark>')
+    )
+
+
+def matching_ids(expression):
+    '''Подзапрос id постов для QuerySet.filter(pk__in=...).'''
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', (expression,)
+    )
+
+
+class SearchResults:
+    '''Ранжированная выдача, которую умеет резать Paginator.
+
+    Из индекса читаются только id и сниппеты нужной страницы, посты
+    затем загружаются одним запросом по первичному ключу.
+    '''
+
+    def __init__(self, expression, queryset):
+        self.expression = expression
+        self.queryset = queryset
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT count(*) FROM {TABLE} WHERE {TABLE} MATCH %s',
+                    (self.expression,)
+                )
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        offset = key.start or 0
+        limit = (key.stop if key.stop is not None else self.count()) - offset
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'''SELECT rowid, snippet({TABLE}, 0, %s, %s, '…', %s)
+                FROM {TABLE} WHERE {TABLE} MATCH %s
+                ORDER BY bm25({TABLE}), rowid DESC
+                LIMIT %s OFFSET %s''',
+                (MARK_START, MARK_END, SNIPPET_TOKENS, self.expression,
+                 limit, offset)
+            )
+            rows = cursor.fetchall()
+        posts = self.queryset.in_bulk([post_id for post_id, _ in rows])
+        results = []
+        for post_id, snippet in rows:
+            if post_id in posts:
+                post = posts[post_id]
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
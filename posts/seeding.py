@@ -0,0 +1,111 @@
+import datetime as dt
+import random
+from contextlib import contextmanager
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters, timeline
+from .models import Comment, Follow, Group, Post, User
+from .utils import batched
+
+BATCH_SIZE = 500
+
+
+@contextmanager
+def manual_dates(*fields):
+    '''Временно отключает auto_now_add, чтобы задать даты вручную.'''
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def power_law_weights(count, alpha):
+    '''Кумулятивные веса Ципфа: первые объекты выбираются чаще.'''
+    return list(accumulate(1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+def bulk_insert(model, objects, batch_size):
+    total = 0
+    for batch in batched(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=batch_size,
+                                      ignore_conflicts=True)
+        total += len(batch)
+    return total
+
+
+def seed(users, groups, posts, comments, follows, alpha=1.1,
+         days=365, batch_size=BATCH_SIZE, random_seed=None):
+    '''Заполняет БД синтетическими данными и возвращает число строк.
+
+    Авторы постов и подписок выбираются по степенному закону, поэтому
+    у немногих авторов много постов и подписчиков, как на живом сайте.
+    '''
+    rnd = random.Random(random_seed)
+    prefix = f'seed{rnd.randrange(10 ** 6)}'
+    password = make_password(None)
+    now = timezone.now()
+    created = {}
+
+    created['users'] = bulk_insert(User, (
+        User(username=f'{prefix}_user{number}', password=password)
+        for number in range(users)
+    ), batch_size)
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{prefix}_'
+    ).order_by('pk').values_list('pk', flat=True))
+    created['groups'] = bulk_insert(Group, (
+        Group(title=f'{prefix} group {number}',
+              slug=f'{prefix}-group-{number}')
+        for number in range(groups)
+    ), batch_size)
+    group_choices = list(Group.objects.filter(
+        slug__startswith=f'{prefix}-'
+    ).values_list('pk', flat=True)) + [None]
+    weights = power_law_weights(len(user_ids), alpha)
+
+    def random_date():
+        return now - dt.timedelta(seconds=rnd.randrange(days * 86400))
+
+    with manual_dates(Post._meta.get_field('pub_date'),
+                      Comment._meta.get_field('created')):
+        created['posts'] = bulk_insert(Post, (
+            Post(text=f'Синтетический пост {number}',
+                 author_id=rnd.choices(user_ids, cum_weights=weights)[0],
+                 group_id=rnd.choice(group_choices),
+                 pub_date=random_date())
+            for number in range(posts)
+        ), batch_size)
+        post_ids = list(Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[:posts])
+        created['comments'] = bulk_insert(Comment, (
+            Comment(post_id=rnd.choice(post_ids),
+                    author_id=rnd.choice(user_ids),
+                    text=f'Синтетический комментарий {number}',
+                    created=random_date())
+            for number in range(comments if post_ids else 0)
+        ), batch_size)
+
+    def follow_pairs():
+        for user_id in user_ids:
+            authors = set(rnd.choices(user_ids, cum_weights=weights,
+                                      k=follows))
+            authors.discard(user_id)
+            for author_id in authors:
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    created['follows'] = bulk_insert(Follow, follow_pairs(), batch_size)
+
+    # bulk_create не отправляет сигналы: ленты и счётчики собираем сами.
+    timeline.rebuild()
+    counters.reconcile_comment_counts(batch_size)
+    counters.reconcile_user_stats(batch_size)
+    return created
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, timeline, versions
+from .models import Comment, Follow, Post
+
+
+def after_commit(bump, *args):
+    '''Меняет версию кэша после коммита транзакции записи.
+
+    Иначе читатель, который ещё видит старый снимок базы, успеет
+    закэшировать устаревшую страницу под уже новой версией.
+    '''
+    transaction.on_commit(lambda: bump(*args))
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        timeline.fan_out(instance)
+        counters.change_user_stats(instance.author_id, posts_count=1)
+    after_commit(
+        versions.bump_post_feeds, instance.author_id,
+        (instance.group_id, getattr(instance, '_previous_group_id', None))
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, posts_count=-1)
+    after_commit(versions.bump_post_feeds, instance.author_id,
+                 (instance.group_id,))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_comment_count(instance.post_id, 1)
+    bump_comment_feeds(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comment_count(instance.post_id, -1)
+    bump_comment_feeds(instance)
+
+
+def bump_comment_feeds(instance):
+    post = Post.objects.filter(pk=instance.post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        author_id, group_id = post
+        after_commit(versions.bump_post_feeds, author_id, (group_id,))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+        counters.change_user_stats(instance.user_id, following_count=1)
+        counters.change_user_stats(instance.author_id, followers_count=1)
+        bump_follow_feeds(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    timeline.remove(instance.user_id, instance.author_id)
+    counters.change_user_stats(instance.user_id, following_count=-1)
+    counters.change_user_stats(instance.author_id, followers_count=-1)
+    bump_follow_feeds(instance)
+
+
+def bump_follow_feeds(instance):
+    after_commit(versions.bump_follow_feed, instance.user_id)
+    # Счётчики подписок видны на страницах обоих профилей
+    after_commit(versions.bump_profile, instance.user_id)
+    after_commit(versions.bump_profile, instance.author_id)
@@ -0,0 +1,45 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOBS_DIR = 'blobs'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    '''Хранит файлы под именем по SHA-256 содержимого.
+
+    Одинаковые загрузки сохраняются один раз, а производные картинки,
+    привязанные к имени файла, становятся общими для всех постов с ним.
+    '''
+
+    def blob_name(self, digest, extension):
+        return f'{BLOBS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        # Хэш считаем по кускам, не загружая файл в память целиком.
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        extension = os.path.splitext(name)[1].lower()
+        name = self.blob_name(digest.hexdigest(), extension)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    def blobs(self):
+        '''Имена всех блобов в хранилище.'''
+        if not self.exists(BLOBS_DIR):
+            return
+        for first in self.listdir(BLOBS_DIR)[0]:
+            for second in self.listdir(f'{BLOBS_DIR}/{first}')[0]:
+                directory = f'{BLOBS_DIR}/{first}/{second}'
+                for filename in self.listdir(directory)[1]:
+                    yield f'{directory}/{filename}'
+
+
+blob_storage = ContentAddressedStorage()
@@ -0,0 +1,52 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from yatube import stampede
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (TypeError, ValueError):
+                raise template.TemplateSyntaxError(
+                    f'"cache_fragment" tag got a non-integer timeout '
+                    f'value: {timeout!r}'
+                )
+        key = make_template_fragment_key(
+            self.name, [var.resolve(context) for var in self.vary_on]
+        )
+        return stampede.get_or_compute(
+            key, lambda: self.nodelist.render(context), timeout
+        )
+
+
+@register.tag
+def cache_fragment(parser, token):
+    '''Как {% cache %}, но без лавины пересчётов при истечении.
+
+    {% cache_fragment timeout name [var ...] %} ... {% endcache_fragment %}
+    '''
+    nodelist = parser.parse(('endcache_fragment',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'"{tokens[0]}" tag requires at least 2 arguments.'
+        )
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Api_author')
+        cls.group = Group.objects.create(title='Группа', slug='api_group')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group)
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_return_selected_fields(self):
+        urls = (
+            reverse('api:index'),
+            reverse('api:group', args=['api_group']),
+            reverse('api:profile', args=['Api_author']),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url, {'fields': 'id,text'}).json()
+                self.assertEqual(data['results'][0],
+                                 {'id': self.posts[-1].pk, 'text': 'Пост 4'})
+
+    def test_cursor_pagination(self):
+        url = reverse('api:index')
+        first = self.client.get(url, {'limit': 3, 'fields': 'id'}).json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+        self.assertIsNone(second['next'])
+
+    def test_post_view(self):
+        with run_on_commit():
+            Comment.objects.create(post=self.posts[0], author=self.author,
+                                   text='Ответ')
+        data = self.client.get(reverse(
+            'api:post', args=['Api_author', self.posts[0].pk]
+        )).json()
+        self.assertEqual(data['comment_count'], 1)
+        self.assertEqual(data['group'], 'api_group')
+        self.assertEqual(data['comments'][0]['text'], 'Ответ')
+
+    def test_conditional_get(self):
+        url = reverse('api:group', args=['api_group'])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        with self.assertNumQueries(2):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        url = reverse('api:post', args=['Api_author', self.posts[0].pk])
+        etag = self.client.get(url)['ETag']
+        with run_on_commit():
+            Comment.objects.create(post=self.posts[0], author=self.author,
+                                   text='Ответ')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_author_routes_do_not_clash_with_feeds(self):
+        author = User.objects.create_user(username='posts')
+        post = Post.objects.create(text='Пост автора posts', author=author)
+        self.assertEqual(reverse('api:profile', args=['posts']),
+                         '/api/v1/users/posts/')
+        data = self.client.get(reverse('api:profile', args=['posts'])).json()
+        self.assertEqual([item['id'] for item in data['results']], [post.pk])
+        data = self.client.get(
+            reverse('api:post', args=['posts', post.pk])
+        ).json()
+        self.assertEqual(data['id'], post.pk)
+
+    def test_errors(self):
+        response = self.client.get(reverse('api:index'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+        response = self.client.get(reverse('api:group', args=['missing']))
+        self.assertEqual(response.status_code, 404)
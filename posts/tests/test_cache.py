@@ -0,0 +1,153 @@
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from posts import versions
+from yatube.cache import FileCache, LocalTier, TwoTierCache
+
+
+class LocalTierTest(SimpleTestCase):
+    def test_least_recently_used_evicted_by_entries(self):
+        tier = LocalTier(max_entries=2, max_bytes=1024)
+        tier.set('a', 1, 60)
+        tier.set('b', 2, 60)
+        tier.get('a')
+        tier.set('c', 3, 60)
+        self.assertEqual(tier.get('a'), (True, 1))
+        self.assertEqual(tier.get('b'), (False, None))
+        self.assertEqual(tier.get('c'), (True, 3))
+
+    def test_evicted_by_bytes(self):
+        tier = LocalTier(max_entries=100, max_bytes=3000)
+        tier.set('a', 'x' * 1000, 60)
+        tier.set('b', 'x' * 1000, 60)
+        tier.set('c', 'x' * 1000, 60)
+        self.assertEqual(tier.get('a'), (False, None))
+        self.assertTrue(tier.get('c')[0])
+        self.assertLessEqual(tier.size, 3000)
+
+    def test_value_larger_than_limit_not_stored(self):
+        tier = LocalTier(max_entries=100, max_bytes=100)
+        tier.set('a', 'x' * 1000, 60)
+        self.assertEqual(tier.get('a'), (False, None))
+        self.assertEqual(tier.size, 0)
+
+    def test_entry_expires(self):
+        tier = LocalTier(max_entries=10, max_bytes=1024)
+        with mock.patch('yatube.cache.time.monotonic', return_value=100):
+            tier.set('a', 1, 5)
+        with mock.patch('yatube.cache.time.monotonic', return_value=104):
+            self.assertEqual(tier.get('a'), (True, 1))
+        with mock.patch('yatube.cache.time.monotonic', return_value=105):
+            self.assertEqual(tier.get('a'), (False, None))
+        self.assertEqual(tier.size, 0)
+
+
+class FileCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def fresh(self):
+        # Отдельный экземпляр на тот же каталог, как в другом процессе
+        return FileCache(self.directory, {})
+
+    def run_threads(self, target, count=8):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_values_visible_to_other_instance(self):
+        self.fresh().set('key', 'значение')
+        self.assertEqual(self.fresh().get('key'), 'значение')
+
+    def test_add_is_atomic(self):
+        results = []
+        self.run_threads(lambda: results.append(
+            self.fresh().add('lock', True, 10)
+        ))
+        self.assertEqual(results.count(True), 1)
+
+    def test_incr_does_not_lose_updates(self):
+        self.fresh().set('counter', 0)
+
+        def increment():
+            cache = self.fresh()
+            for _ in range(10):
+                cache.incr('counter')
+
+        self.run_threads(increment)
+        self.assertEqual(self.fresh().get('counter'), 80)
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.shared = caches['shared']
+        self.cache.clear()
+
+    def other_process(self):
+        # Свой кэш процесса, общий кэш тот же
+        return TwoTierCache('other', {'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_PREFIXES': self.cache.prefixes,
+        }})
+
+    def test_hot_key_served_from_process_memory(self):
+        self.cache.set('posts:page:index:1:abc', 'страница')
+        self.shared.delete('posts:page:index:1:abc')
+        self.assertEqual(self.cache.get('posts:page:index:1:abc'), 'страница')
+
+    def test_shared_value_copied_to_process_memory(self):
+        self.shared.set('posts:feed:index:1', 'лента')
+        self.assertEqual(self.cache.get('posts:feed:index:1'), 'лента')
+        self.shared.delete('posts:feed:index:1')
+        self.assertEqual(self.cache.get('posts:feed:index:1'), 'лента')
+        self.assertEqual(
+            self.cache.get_many(['posts:feed:index:1']),
+            {'posts:feed:index:1': 'лента'},
+        )
+
+    def test_other_keys_always_read_from_shared(self):
+        self.cache.set(versions.INDEX_KEY, 1)
+        self.shared.set(versions.INDEX_KEY, 2)
+        self.assertEqual(self.cache.get(versions.INDEX_KEY), 2)
+
+    def test_version_bump_in_other_process_seen_immediately(self):
+        version = versions.index_version()
+        self.cache.set(f'posts:page:index:{version}:abc', 'старая')
+        self.other_process().incr(versions.INDEX_KEY)
+        new_version = versions.index_version()
+        self.assertNotEqual(new_version, version)
+        self.assertIsNone(
+            self.cache.get(f'posts:page:index:{new_version}:abc')
+        )
+
+    def test_local_copy_lives_no_longer_than_local_timeout(self):
+        with mock.patch('yatube.cache.time.monotonic', return_value=100):
+            self.cache.set('posts:page:index:1:abc', 'страница', 600)
+        self.shared.set('posts:page:index:1:abc', 'обновлённая', 600)
+        with mock.patch('yatube.cache.time.monotonic',
+                        return_value=100 + self.cache.local_timeout):
+            self.assertEqual(self.cache.get('posts:page:index:1:abc'),
+                             'обновлённая')
+
+    def test_add_and_incr_decided_by_shared(self):
+        other = self.other_process()
+        self.assertTrue(self.cache.add('posts:page:lock', True))
+        self.assertFalse(other.add('posts:page:lock', True))
+        self.cache.set('posts:page:counter', 1)
+        self.assertEqual(other.incr('posts:page:counter'), 2)
+        self.assertEqual(self.shared.get('posts:page:counter'), 2)
+
+    def test_delete_drops_both_tiers(self):
+        self.cache.set('posts:page:index:1:abc', 'страница')
+        self.cache.delete('posts:page:index:1:abc')
+        self.assertIsNone(self.cache.get('posts:page:index:1:abc'))
+        self.assertIsNone(self.shared.get('posts:page:index:1:abc'))
@@ -0,0 +1,389 @@
+import datetime as dt
+import gzip
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from posts import counters, derivatives, versions
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry,
+                          UserStats)
+from posts.storage import blob_storage
+
+User = get_user_model()
+
+
+class RebuildTimelinesCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Test_author')
+        cls.reader = User.objects.create_user(username='Test_reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(text='Тестовый текст',
+                                       author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        '''Новый пост автора попадает в ленту подписчика.'''
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post
+        ).exists())
+
+    def test_rebuild_restores_lost_entries(self):
+        '''Команда rebuild_timelines восстанавливает ленты подписок.'''
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page']), [self.post])
+
+
+class ReconcileCommentCountsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='Test_author')
+        cls.post = Post.objects.create(text='Тестовый текст', author=author)
+        cls.empty_post = Post.objects.create(text='Без комментариев',
+                                             author=author)
+        for number in range(3):
+            Comment.objects.create(post=cls.post, author=author,
+                                   text=f'Комментарий {number}')
+
+    def test_reconcile_fixes_drifted_counts(self):
+        '''Команда reconcile_comment_counts исправляет счётчики.'''
+        Post.objects.update(comment_count=7)
+        call_command('reconcile_comment_counts', '--batch-size=1',
+                     stdout=StringIO())
+        counts = dict(Post.objects.values_list('pk', 'comment_count'))
+        self.assertEqual(counts[self.post.pk], 3)
+        self.assertEqual(counts[self.empty_post.pk], 0)
+
+
+class ReconcileUserStatsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Test_author')
+        cls.reader = User.objects.create_user(username='Test_reader')
+        Post.objects.create(text='Тестовый текст', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_stats_follow_profile_changes(self):
+        '''Счётчики профиля меняются при подписке и новых постах.'''
+        stats = counters.get_user_stats(self.author)
+        Post.objects.create(text='Ещё пост', author=self.author)
+        Follow.objects.filter(user=self.reader).delete()
+        stats.refresh_from_db()
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (2, 0, 0)
+        )
+
+    def test_reconcile_fixes_drifted_stats(self):
+        '''Команда reconcile_user_stats создаёт и исправляет счётчики.'''
+        UserStats.objects.create(user=self.author, posts_count=5)
+        call_command('reconcile_user_stats', stdout=StringIO())
+        stats = UserStats.objects.in_bulk()
+        author_stats = stats[self.author.pk]
+        self.assertEqual(
+            (author_stats.posts_count, author_stats.followers_count),
+            (1, 1)
+        )
+        self.assertEqual(stats[self.reader.pk].following_count, 1)
+
+
+class SeedAndBenchmarkCommandsTest(TestCase):
+    def test_seed_feeds_creates_consistent_data(self):
+        '''seed_feeds создаёт данные вместе с лентами и счётчиками.'''
+        call_command('seed_feeds', '--users=20', '--groups=2', '--posts=60',
+                     '--comments=30', '--follows=5', '--seed=1',
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertTrue(Follow.objects.exists())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(author__following__user=follow.user).count()
+        )
+        self.assertEqual(
+            sum(Post.objects.values_list('comment_count', flat=True)), 30
+        )
+
+    def test_benchmark_feeds_reports_json(self):
+        '''benchmark_feeds выводит p50, p95 и число запросов по лентам.'''
+        call_command('seed_feeds', '--users=10', '--groups=1', '--posts=40',
+                     '--comments=10', '--follows=3', '--seed=2',
+                     stdout=StringIO())
+        cache.set('live_key', 'значение')
+        output = StringIO()
+        call_command('benchmark_feeds', '--repeat=2', '--depth=1',
+                     '--depth=2', stdout=output)
+        self.assertEqual(cache.get('live_key'), 'значение')
+        report = json.loads(output.getvalue())
+        self.assertEqual(set(report['index']), {'1', '2'})
+        for feed in ('group', 'profile', 'post', 'follow_index'):
+            with self.subTest(feed=feed):
+                self.assertEqual(set(report[feed]['1']),
+                                 {'p50_ms', 'p95_ms', 'queries'})
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class BackfillDerivativesCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_backfill_creates_all_derivatives(self):
+        '''backfill_derivatives создаёт все размеры в WebP и JPEG.'''
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(buffer, 'PNG')
+        author = User.objects.create_user(username='Test_author')
+        post = Post.objects.create(
+            text='Пост с картинкой',
+            author=author,
+            image=SimpleUploadedFile('red.png', buffer.getvalue(),
+                                     content_type='image/png')
+        )
+        version = versions.profile_version(author.pk)
+        call_command('backfill_derivatives', '--processes=1',
+                     stdout=StringIO())
+        self.assertNotEqual(versions.profile_version(author.pk), version)
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail,
+                         derivatives.prefix_for(post.image.name))
+        for width in derivatives.WIDTHS:
+            for extension in derivatives.FORMATS:
+                name = derivatives.derivative_name(post.thumbnail, width,
+                                                   extension)
+                with self.subTest(name=name):
+                    self.assertTrue(default_storage.exists(name))
+        with default_storage.open(derivatives.derivative_name(
+                post.thumbnail, 320, 'webp')) as derivative:
+            self.assertEqual(Image.open(derivative).size, (320, 113))
+
+    def test_store_replaces_existing_derivative(self):
+        '''Два задания для одной картинки не оставляют дубликатов.'''
+        name = derivatives.derivative_name('derivatives/aa/bb', 320, 'jpg')
+        derivatives.store(default_storage, name, b'first')
+        derivatives.store(default_storage, name, b'second')
+        self.assertEqual(default_storage.listdir('derivatives/aa/bb'),
+                         ([], ['320w.jpg']))
+        with default_storage.open(name) as derivative:
+            self.assertEqual(derivative.read(), b'second')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ContentAddressedImagesTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self, filename):
+        buffer = BytesIO()
+        Image.new('RGB', (100, 50), 'blue').save(buffer, 'PNG')
+        return Post.objects.create(
+            text='Пост с картинкой',
+            author=self.author,
+            image=SimpleUploadedFile(filename, buffer.getvalue(),
+                                     content_type='image/png')
+        )
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Test_author')
+
+    def test_same_upload_stored_once(self):
+        '''Одинаковые картинки сохраняются в один файл.'''
+        first = self.create_post('first.png')
+        second = self.create_post('second.png')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(list(blob_storage.blobs()), [first.image.name])
+
+    def test_collect_removes_only_orphaned_blobs(self):
+        '''collect_image_blobs удаляет файлы без постов и их производные.'''
+        first = self.create_post('first.png')
+        second = self.create_post('second.png')
+        name = first.image.name
+        prefix = derivatives.render(name)
+        first.delete()
+        call_command('collect_image_blobs', '--grace-hours=0',
+                     stdout=StringIO())
+        self.assertTrue(blob_storage.exists(name))
+        second.delete()
+        call_command('collect_image_blobs', '--grace-hours=0',
+                     stdout=StringIO())
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(default_storage.exists(
+            derivatives.derivative_name(prefix, 320, 'webp')
+        ))
+
+
+class ImportDumpCommandTest(TestCase):
+    def setUp(self):
+        self.existing = User.objects.create_user(username='Existing')
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def records(self):
+        yield {'model': 'contenttypes.contenttype', 'pk': 1,
+               'fields': {'app_label': 'posts', 'model': 'post'}}
+        # Подписка раньше пользователей: откладывается до конца загрузки
+        yield {'model': 'posts.follow', 'pk': 1,
+               'fields': {'user': 11, 'author': 10}}
+        yield {'model': 'auth.user', 'pk': 10,
+               'fields': {'username': 'Existing', 'password': '!'}}
+        yield {'model': 'auth.user', 'pk': 11,
+               'fields': {'username': 'Imported', 'password': '!',
+                          'date_joined': '2021-11-10T16:25:11.697Z'}}
+        yield {'model': 'posts.group', 'pk': 5,
+               'fields': {'title': 'Группа', 'slug': 'imported',
+                          'description': ''}}
+        for pk in range(1, 6):
+            yield {'model': 'posts.post', 'pk': pk,
+                   'fields': {'text': f'Пост {pk}', 'author': 10,
+                              'group': 5 if pk % 2 else None,
+                              'pub_date': f'2021-11-1{pk}T10:00:00Z'}}
+        for pk in range(1, 4):
+            yield {'model': 'posts.comment', 'pk': pk,
+                   'fields': {'post': 1, 'author': 11, 'text': 'Ответ',
+                              'created': '2021-11-20T10:00:00Z'}}
+
+    def import_dump(self, path):
+        output = StringIO()
+        call_command('import_dump', path, '--batch-size=2', stdout=output)
+        return output.getvalue()
+
+    def check_imported(self, output):
+        self.assertIn('строк/с', output)
+        self.assertIn('Пропущено записей: 1', output)
+        imported = User.objects.get(username='Imported')
+        posts = Post.objects.filter(author=self.existing).order_by('pk')
+        self.assertEqual(list(posts.values_list('pk', flat=True)),
+                         [1, 2, 3, 4, 5])
+        self.assertEqual(posts.get(pk=3).group.slug, 'imported')
+        self.assertEqual(posts.get(pk=3).pub_date.day, 13)
+        self.assertEqual(posts.get(pk=1).comment_count, 3)
+        self.assertEqual(counters.get_user_stats(self.existing).posts_count,
+                         5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=imported).count(), 5
+        )
+
+    def test_import_json_array(self):
+        path = f'{self.directory}/dump.json'
+        with open(path, 'w', encoding='utf-8') as dump:
+            json.dump(list(self.records()), dump, indent=2)
+        self.check_imported(self.import_dump(path))
+
+    def test_import_gzipped_jsonl(self):
+        path = f'{self.directory}/dump.jsonl.gz'
+        with gzip.open(path, 'wt', encoding='utf-8') as dump:
+            for record in self.records():
+                dump.write(json.dumps(record) + '\n')
+        self.check_imported(self.import_dump(path))
+
+    def test_only_touched_rows_are_rebuilt(self):
+        '''Ленты и счётчики непричастных к дампу строк не пересчитываются.'''
+        reader = User.objects.create_user(username='Existing_reader')
+        Follow.objects.create(user=reader, author=self.existing)
+        bystander = User.objects.create_user(username='Bystander')
+        other = User.objects.create_user(username='Other_author')
+        Follow.objects.create(user=bystander, author=other)
+        other_post = Post.objects.create(text='Чужой пост', author=other)
+        TimelineEntry.objects.filter(user=bystander).delete()
+        Post.objects.filter(pk=other_post.pk).update(comment_count=7)
+        path = f'{self.directory}/dump.json'
+        with open(path, 'w', encoding='utf-8') as dump:
+            json.dump(list(self.records()), dump)
+        self.import_dump(path)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), 5
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=bystander).exists())
+        other_post.refresh_from_db()
+        self.assertEqual(other_post.comment_count, 7)
+
+    def test_truncated_dump_is_reported(self):
+        path = f'{self.directory}/broken.json'
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write('[{"model": "posts.group", "pk": 1, "fields": {')
+        with self.assertRaises(CommandError):
+            self.import_dump(path)
+
+
+class ExportContentCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Exported')
+        cls.reader = User.objects.create_user(username='Export_reader')
+        cls.group = Group.objects.create(title='Группа', slug='exported')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group)
+            for number in range(5)
+        ]
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text='Ответ')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.watermark = f'{self.directory}/watermark.json'
+
+    def export(self, name, *args):
+        path = f'{self.directory}/{name}'
+        call_command('export_content', path, '--settle=0', '--chunk-size=2',
+                     *args, stdout=StringIO())
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as export:
+            return [json.loads(line) for line in export]
+
+    def count(self, records, label):
+        return sum(record['model'] == label for record in records)
+
+    def test_incremental_export_with_watermark(self):
+        records = self.export('full.jsonl.gz', '--watermark', self.watermark)
+        self.assertEqual(self.count(records, 'posts.post'), 5)
+        self.assertEqual(self.count(records, 'posts.comment'), 1)
+        self.assertEqual(self.count(records, 'posts.follow'), 1)
+        post = next(record for record in records
+                    if record['model'] == 'posts.post'
+                    and record['pk'] == self.posts[0].pk)
+        self.assertEqual(post['fields']['author'], self.author.pk)
+
+        Post.objects.create(text='Новый пост', author=self.reader)
+        records = self.export('next.jsonl', '--watermark', self.watermark)
+        self.assertEqual(
+            [record['fields']['text'] for record in records
+             if record['model'] == 'posts.post'],
+            ['Новый пост']
+        )
+        self.assertEqual(self.count(records, 'posts.comment'), 0)
+        self.assertEqual(self.count(records, 'posts.group'), 1)
+
+    def test_export_since_date(self):
+        old = [post.pk for post in self.posts[:3]]
+        Post.objects.filter(pk__in=old).update(
+            pub_date=timezone.make_aware(dt.datetime(2020, 1, 1))
+        )
+        records = self.export('since.jsonl', '--since=2021-01-01',
+                              '--model=posts.post')
+        self.assertEqual(len(records), 2)
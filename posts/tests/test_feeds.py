@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.feeds import GroupFeed
+from posts.models import Group, Post
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class PostsFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Feed_author')
+        cls.group = Group.objects.create(title='Группа', slug='feed_group',
+                                         description='Описание')
+        Post.objects.create(text='Пост в группе', author=cls.author,
+                            group=cls.group)
+        Post.objects.create(text='Пост без группы', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_list_posts(self):
+        feeds = {
+            reverse('posts:index_rss'): ('Пост в группе', 'Пост без группы'),
+            reverse('posts:group_rss', args=['feed_group']): (
+                'Пост в группе',
+            ),
+            reverse('posts:profile_atom', args=['Feed_author']): (
+                'Пост в группе', 'Пост без группы'
+            ),
+        }
+        for url, texts in feeds.items():
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                for text in texts:
+                    self.assertIn(text, content)
+        response = self.client.get(reverse('posts:group_atom',
+                                           args=['feed_group']))
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/atom+xml'
+        ))
+        self.assertNotIn('Пост без группы', response.content.decode())
+
+    def test_feed_rendered_once_per_change(self):
+        url = reverse('posts:group_rss', args=['feed_group'])
+        with mock.patch.object(Feed, 'get_feed', autospec=True,
+                               side_effect=Feed.get_feed) as render:
+            self.client.get(url)
+            self.client.get(url)
+            self.assertEqual(render.call_count, 1)
+            with run_on_commit():
+                Post.objects.create(text='Свежий пост', author=self.author,
+                                    group=self.group)
+            self.assertIn('Свежий пост', self.client.get(url).content.decode())
+            self.assertEqual(render.call_count, 2)
+
+    def test_feed_object_looked_up_once(self):
+        url = reverse('posts:group_rss', args=['feed_group'])
+        with mock.patch.object(GroupFeed, 'get_object', autospec=True,
+                               side_effect=GroupFeed.get_object) as lookup:
+            self.client.get(url)
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_conditional_get(self):
+        url = reverse('posts:profile_rss', args=['Feed_author'])
+        response = self.client.get(url)
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(cached.status_code, 304)
+        with run_on_commit():
+            Post.objects.create(text='Свежий пост', author=self.author)
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+
+    def test_unknown_group_feed(self):
+        response = self.client.get(reverse('posts:group_rss',
+                                           args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_cached_per_scheme(self):
+        url = reverse('posts:index_rss')
+        content = self.client.get(url).content.decode()
+        self.assertIn('http://testserver/', content)
+        content = self.client.get(url, secure=True).content.decode()
+        self.assertIn('https://testserver/', content)
+        self.assertNotIn('http://testserver/', content)
+
+    def test_site_pages_do_not_hide_profiles(self):
+        for username in ('rss', 'atom', 'search', 'feeds'):
+            with self.subTest(username=username):
+                User.objects.create_user(username=username)
+                response = self.client.get(
+                    reverse('posts:profile', args=[username])
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['author'].username,
+                                 username)
@@ -1,15 +1,22 @@
 import datetime as dt
 import shutil
 import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.forms import PostForm
-from posts.models import Group, Post
+from posts.models import Group, Post, ThumbnailJob
+from posts.storage import blob_storage
 
 User = get_user_model()
 tmp_media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -145,3 +152,81 @@ class PostFormTests(TestCase):
                 author=author,
             ).exists()
         )
+
+    def test_thumbnail_generated_off_request(self):
+        '''Миниатюра создаётся заданием, до этого видна заглушка.'''
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        image = SimpleUploadedFile(
+            name='thumb.gif',
+            content=small_gif,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:new_post'),
+            data={'text': 'Пост с картинкой', 'image': image}
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(post.thumbnail, '')
+        self.assertTrue(ThumbnailJob.objects.filter(
+            post=post, status=ThumbnailJob.PENDING
+        ).exists())
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Изображение обрабатывается')
+
+        call_command('process_thumbnails', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertNotEqual(post.thumbnail, '')
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, post.thumbnail_url)
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '320w')
+
+    def post_png(self, size):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'green').save(buffer, 'PNG')
+        image = SimpleUploadedFile(name='big.png', content=buffer.getvalue(),
+                                   content_type='image/png')
+        return self.authorized_client.post(
+            reverse('posts:new_post'),
+            data={'text': 'Большая картинка', 'image': image}
+        )
+
+    def test_image_stored_before_write_transaction(self):
+        '''Файл картинки пишется до транзакции с постом.'''
+        depth = len(connection.savepoint_ids)
+        depths = []
+        save = blob_storage.save
+
+        def tracked_save(*args, **kwargs):
+            depths.append(len(connection.savepoint_ids))
+            return save(*args, **kwargs)
+
+        with mock.patch.object(blob_storage, 'save',
+                               side_effect=tracked_save):
+            self.post_png((10, 10))
+        self.assertTrue(Post.objects.filter(text='Большая картинка').exists())
+        self.assertEqual(depths, [depth])
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=100)
+    def test_upload_over_byte_limit_rejected(self):
+        '''Файл больше MAX_IMAGE_UPLOAD_SIZE отклоняется при загрузке.'''
+        response = self.post_png((300, 300))
+        self.assertFalse(Post.objects.filter(text='Большая картинка').exists())
+        self.assertIn('Файл слишком большой',
+                      response.context['form'].errors['image'][0])
+
+    @override_settings(MAX_IMAGE_PIXELS=1000)
+    def test_upload_over_pixel_limit_rejected(self):
+        '''Картинка больше MAX_IMAGE_PIXELS отклоняется по заголовку.'''
+        response = self.post_png((100, 50))
+        self.assertFalse(Post.objects.filter(text='Большая картинка').exists())
+        self.assertIn('100x50', response.context['form'].errors['image'][0])
@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from yatube.cache import FileCache
+from yatube.metrics import MetricsRegistry, registry
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def test_metrics_disabled_by_default(self):
+        '''Без настройки заголовок Server-Timing не добавляется.'''
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_METRICS_ENABLED=True)
+    def test_server_timing_header(self):
+        '''Ответ содержит время БД, шаблонов и всего запроса.'''
+        response = Client().get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for part in ('db;dur=', 'queries', 'tpl;dur=', 'total;dur='):
+            with self.subTest(part=part):
+                self.assertIn(part, timing)
+
+    @override_settings(REQUEST_METRICS_ENABLED=True)
+    def test_metrics_aggregated_by_url_name(self):
+        '''Метрики копятся в гистограммах по имени URL.'''
+        client = Client()
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:index'))
+        report = registry.snapshot()
+        self.assertEqual(report['posts:index']['duration']['count'], 2)
+        self.assertEqual(
+            sum(report['posts:index']['queries']['buckets'].values()), 2
+        )
+
+    @override_settings(REQUEST_METRICS_ENABLED=True)
+    def test_metrics_visible_from_other_process(self):
+        '''Команда в отдельном процессе видит метрики воркера.'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        file_caches = {**settings.CACHES, 'metrics': {
+            'BACKEND': 'yatube.cache.FileCache', 'LOCATION': directory,
+        }}
+        with override_settings(CACHES=file_caches,
+                               REQUEST_METRICS_CACHE='metrics'):
+            Client().get(reverse('posts:index'))
+            registry.flush()
+        fresh = FileCache(directory, {})
+        with mock.patch.object(MetricsRegistry, 'cache',
+                               new_callable=mock.PropertyMock,
+                               return_value=fresh):
+            report = MetricsRegistry().snapshot()
+        self.assertEqual(report['posts:index']['duration']['count'], 1)
@@ -1,9 +1,11 @@
 import datetime as dt
+from unittest import skipUnless
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Follow, Group, Post
 
 User = get_user_model()
 
@@ -57,3 +59,32 @@ class PostModelTest(TestCase):
         for object_name, expected in object_names.items():
             with self.subTest():
                 self.assertEqual(expected, str(object_name))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class FeedIndexesTest(TestCase):
+    '''Запросы лент используют составные индексы.'''
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Test_user')
+        cls.reader = User.objects.create_user(username='Test_reader')
+        cls.group = Group.objects.create(title='Test_group', slug='Test_group')
+        cls.post = Post.objects.create(text='Тестовый текст',
+                                       author=cls.author, group=cls.group)
+
+    def test_feed_queries_use_composite_indexes(self):
+        '''Каждый запрос ленты ищет по своему составному индексу.'''
+        queries = {
+            'post_author_pub_date_idx': self.author.posts.for_feed()
+            .order_by('-pub_date', '-id')[:6],
+            'post_group_pub_date_idx': self.group.posts.for_feed()
+            .order_by('-pub_date', '-id')[:6],
+            'comment_post_created_idx': self.post.comments.all(),
+            'follow_author_user_idx': Follow.objects.filter(
+                author=self.author
+            ).values('user'),
+        }
+        for index, queryset in queries.items():
+            with self.subTest(index=index):
+                self.assertIn(index, queryset.explain())
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import tempfile
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.test import Client, SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from yatube.db import atomic_write
+from yatube.sqlite import benchmark
+from yatube.sqlite.base import DatabaseWrapper, begin_statement
+
+User = get_user_model()
+OPTIONS = {
+    'timeout': 1,
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -2000,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Настройки бэкенда SQLite')
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'test.sqlite3')
+        self.wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': self.path,
+             'OPTIONS': OPTIONS},
+            alias='sqlite_test',
+        )
+        self.addCleanup(self.wrapper.close)
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_new_connection(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -2000)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+    def begin(self, write):
+        self.wrapper.ensure_connection()
+        self.wrapper.write_transaction = write
+        self.wrapper._start_transaction_under_autocommit()
+        self.addCleanup(self.wrapper.connection.rollback)
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        return other
+
+    def test_write_transaction_takes_lock_at_begin(self):
+        other = self.begin(write=True)
+        with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+            other.execute('BEGIN IMMEDIATE')
+
+    def test_other_transactions_do_not_take_write_lock(self):
+        other = self.begin(write=False)
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+
+    def test_unknown_transaction_mode(self):
+        self.assertEqual(begin_statement(None), 'BEGIN')
+        self.assertEqual(begin_statement('immediate'), 'BEGIN IMMEDIATE')
+        with self.assertRaises(ImproperlyConfigured):
+            begin_statement('LAZY')
+
+    def test_benchmark_tuned_writes_without_lock_errors(self):
+        report = benchmark.run(OPTIONS, readers=2, writers=2,
+                               duration=0.3, rows=200)
+        self.assertEqual(set(report), {'stock', 'tuned'})
+        self.assertEqual(report['tuned']['write']['errors'], 0)
+        self.assertGreater(report['tuned']['write']['per_second'], 0)
+        self.assertGreater(report['tuned']['read']['per_second'], 0)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'BEGIN IMMEDIATE в SQLite')
+class AtomicWriteTest(TransactionTestCase):
+    def begins(self, block):
+        with CaptureQueriesContext(connection) as queries:
+            with block():
+                User.objects.count()
+        return self.begin_statements(queries)
+
+    def begin_statements(self, queries):
+        return [query['sql'] for query in queries.captured_queries
+                if query['sql'].startswith('BEGIN')]
+
+    def test_only_write_blocks_begin_immediate(self):
+        self.assertEqual(self.begins(atomic_write), ['BEGIN IMMEDIATE'])
+        self.assertEqual(self.begins(transaction.atomic), ['BEGIN'])
+
+    def test_nested_block_reuses_outer_transaction(self):
+        with transaction.atomic():
+            self.assertEqual(self.begins(atomic_write), [])
+        self.assertFalse(connection.write_transaction)
+
+    def test_follow_views_write_in_one_transaction(self):
+        User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(User.objects.create_user(username='reader'))
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(view=name):
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(reverse(name, args=['author']))
+                self.assertEqual(self.begin_statements(queries),
+                                 ['BEGIN IMMEDIATE'])
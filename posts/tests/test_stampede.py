@@ -0,0 +1,96 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from yatube import stampede
+
+
+class StampedeCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value='свежее', delay=0):
+        def compute():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return compute
+
+    def test_value_is_computed_once(self):
+        for _ in range(3):
+            self.assertEqual(
+                stampede.get_or_compute('key', self.compute(), 60), 'свежее'
+            )
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_other_worker_refreshes(self):
+        cache.set('key', ('старое', time.time() - 1, 0.1), 60)
+        cache.add(stampede.lock_key('key'), True, 10)
+        value = stampede.get_or_compute('key', self.compute(), 60)
+        self.assertEqual(value, 'старое')
+        self.assertEqual(self.calls, 0)
+
+    def test_waits_for_other_worker_without_stale_value(self):
+        cache.add(stampede.lock_key('key'), True, 10)
+
+        def other_worker_done(seconds):
+            cache.set('key', ('чужое', time.time() + 60, 0.1), 60)
+
+        with mock.patch('yatube.stampede.time.sleep',
+                        side_effect=other_worker_done):
+            value = stampede.get_or_compute('key', self.compute(), 60)
+        self.assertEqual(value, 'чужое')
+        self.assertEqual(self.calls, 0)
+
+    def test_timed_out_waiter_keeps_other_workers_lock(self):
+        cache.add(stampede.lock_key('key'), True, 10)
+        with mock.patch('yatube.stampede.wait_for', return_value=None):
+            value = stampede.get_or_compute('key', self.compute(), 60)
+        self.assertEqual(value, 'свежее')
+        self.assertTrue(cache.get(stampede.lock_key('key')))
+
+    def test_probabilistic_early_refresh(self):
+        cache.set('key', ('старое', time.time() + 5, 1.0), 60)
+        with mock.patch('yatube.stampede.random.random', return_value=0.0):
+            value = stampede.get_or_compute('key', self.compute(), 60)
+        self.assertEqual(value, 'старое')
+        with mock.patch('yatube.stampede.random.random',
+                        return_value=0.999999):
+            value = stampede.get_or_compute('key', self.compute(), 60)
+        self.assertEqual(value, 'свежее')
+        self.assertIsNone(cache.get(stampede.lock_key('key')))
+
+    def test_concurrent_misses_compute_once(self):
+        results = []
+        compute = self.compute(delay=0.2)
+
+        def worker():
+            results.append(stampede.get_or_compute('key', compute, 60))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['свежее'] * 8)
+        self.assertEqual(self.calls, 1)
+
+    def test_cache_fragment_tag(self):
+        template = Template(
+            '{% load fragments %}'
+            '{% cache_fragment 60 fragment version %}{{ text }}'
+            '{% endcache_fragment %}'
+        )
+
+        def render(text, version):
+            return template.render(Context({'text': text,
+                                            'version': version}))
+
+        self.assertEqual(render('первый', 1), 'первый')
+        self.assertEqual(render('второй', 1), 'первый')
+        self.assertEqual(render('второй', 2), 'второй')
@@ -1,15 +1,25 @@
 import datetime as dt
+import json
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.core.cache import cache
-from posts.models import Comment, Follow, Group, Post
+from posts import counters, pagecache, versions
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.paginator import CappedCountPaginator
+from posts.tests.utils import run_on_commit
+from yatube.cache import FileCache
 
 User = get_user_model()
 tmp_media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -65,6 +75,7 @@ class PostPagesTests(TestCase):
         super().tearDownClass()
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='TestUser')
         self.authorized_client = Client()
@@ -102,7 +113,8 @@ class PostPagesTests(TestCase):
         test_context = response.context['page'][0]
         self.assertEqual(test_context.group.title, 'Test_group')
         self.assertEqual(test_context.group.slug, 'Test_group_slug')
-        self.assertIn(test_context.image.name, 'posts/small.gif')
+        self.assertEqual(test_context.image.name, self.post.image.name)
+        self.assertTrue(test_context.image.name.endswith('.gif'))
 
     def test_new_shows_correct_context(self):
         '''Шаблон new.html сформирован с правильным контекстом.'''
@@ -179,21 +191,72 @@ class PostPagesTests(TestCase):
         self.assertNotEqual(post, response.context.get('page'))
 
     def test_cache(self):
+        '''Лента отдаётся из кэша, пока посты не изменились через ORM.'''
+        cache.clear()
         response_1 = self.authorized_client.get(reverse('posts:index')).content
-        author = self.user
-        pub_date = dt.datetime.now().date()
-        Post.objects.create(
-            text='Второй тестовый текст',
-            pub_date=pub_date,
-            author=author,
-            group=self.group
-        )
+        Post.objects.filter(pk=self.post.pk).update(text='Изменён без сигнала')
         response_2 = self.authorized_client.get(reverse('posts:index')).content
         self.assertEqual(response_1, response_2)
         cache.clear()
         response_3 = self.authorized_client.get(reverse('posts:index')).content
         self.assertNotEqual(response_1, response_3)
 
+    def test_new_post_invalidates_cached_feeds(self):
+        '''Новый пост сразу виден в кэшированных лентах.'''
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'Test_group_slug'}),
+            reverse('posts:profile', kwargs={'username': 'TestUser'}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        with run_on_commit():
+            Post.objects.create(
+                text='Второй тестовый текст',
+                author=self.user,
+                group=self.group
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Второй тестовый текст')
+
+    def test_feed_versions_bumped_after_commit(self):
+        '''Версии лент меняются только после коммита записи.'''
+        version = versions.index_version()
+        with run_on_commit():
+            Post.objects.create(text='Текст', author=self.user)
+            self.assertEqual(versions.index_version(), version)
+        self.assertNotEqual(versions.index_version(), version)
+
+    def test_cached_feed_fragment_skips_feed_query(self):
+        '''Лента из кэша фрагментов не читает посты из базы.'''
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'Test_group_slug'}),
+            reverse('posts:profile', kwargs={'username': 'TestUser'}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url)
+                feed_queries = [
+                    query['sql'] for query in queries.captured_queries
+                    if 'FROM "posts_post"' in query['sql']
+                ]
+                self.assertEqual(feed_queries, [])
+
+    def test_new_comment_invalidates_cached_feeds(self):
+        '''Новый комментарий сразу меняет счётчик в кэшированной ленте.'''
+        self.authorized_client.get(reverse('posts:index'))
+        with run_on_commit():
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text='Комментарий')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 1')
+
     def test_authorized_client_allowed_to_follow(self):
         '''Авторизованный пользователь может подписываться.'''
         user = self.user
@@ -257,6 +320,18 @@ class PostPagesTests(TestCase):
             follow=True
         )
         self.assertEqual(Comment.objects.count(), comment_count + 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_edit_post_keeps_comment_count(self):
+        '''Редактирование поста не перезаписывает счётчик комментариев.'''
+        post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        post.text = 'Отредактированный текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
 
     def test_guest_client_not_allowed_to_add_comment(self):
         '''Неавторизованный пользователь не может оставлять комментарий.'''
@@ -290,7 +365,456 @@ class PaginatorViewsTest(TestCase):
                 group=group,
             )
 
+    def setUp(self):
+        # Страницы анонимам отдаются из кэша, он общий для всех тестов
+        cache.clear()
+
     def test_index_page_containse_ten_records(self):
         '''На главной странице отображается 10 постов. '''
         response = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(len(response.context.get('page').object_list), 10)
+
+    def test_index_next_cursor_shows_remaining_records(self):
+        '''По курсору следующей страницы выводятся оставшиеся 3 поста.'''
+        first_page = self.guest_client.get(reverse('posts:index'))
+        next_cursor = first_page.context['page'].next_cursor
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': next_cursor}
+        )
+        page = response.context['page']
+        self.assertEqual(len(page.object_list), 3)
+        self.assertTrue(page.has_previous())
+        self.assertFalse(page.has_next())
+
+    def test_index_previous_cursor_returns_first_page(self):
+        '''Курсор предыдущей страницы возвращает первую страницу.'''
+        first_page = self.guest_client.get(reverse('posts:index'))
+        next_cursor = first_page.context['page'].next_cursor
+        second_page = self.guest_client.get(
+            reverse('posts:index'), {'cursor': next_cursor}
+        )
+        response = self.guest_client.get(
+            reverse('posts:index'),
+            {'cursor': second_page.context['page'].previous_cursor}
+        )
+        page = response.context['page']
+        self.assertEqual(list(page.object_list),
+                         list(first_page.context['page'].object_list))
+        self.assertFalse(page.has_previous())
+
+    def test_index_invalid_cursor_shows_first_page(self):
+        '''Некорректный курсор открывает первую страницу.'''
+        response = self.guest_client.get(reverse('posts:index'),
+                                         {'cursor': 'broken'})
+        self.assertEqual(len(response.context['page'].object_list), 10)
+        self.assertFalse(response.context['page'].has_previous())
+
+
+class FeedQueriesTest(TestCase):
+    '''Число запросов к БД на страницах лент не зависит от числа постов.'''
+    FEED_QUERY_BUDGET = 10
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Feed_author')
+        cls.reader = User.objects.create_user(username='Feed_reader')
+        cls.group = Group.objects.create(title='Feed_group', slug='feed')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.feed_urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'feed'}),
+            reverse('posts:profile', kwargs={'username': 'Feed_author'}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def create_posts(self, count):
+        for number in range(count):
+            post = Post.objects.create(
+                text=f'Пост {number}',
+                author=self.author,
+                group=self.group
+            )
+            Comment.objects.create(post=post, author=self.reader,
+                                   text='Комментарий')
+
+    def count_queries(self, url):
+        # Прогрев: записи, создаваемые при первом чтении, не в счёт.
+        self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        '''Лента укладывается в бюджет запросов при любом числе постов.'''
+        self.create_posts(1)
+        before = {url: self.count_queries(url) for url in self.feed_urls}
+        self.create_posts(9)
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                queries = self.count_queries(url)
+                self.assertEqual(queries, before[url])
+                self.assertLessEqual(queries, self.FEED_QUERY_BUDGET)
+
+
+class FollowFeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Followed_author')
+        cls.other_author = User.objects.create_user(username='Other_author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.other_reader = User.objects.create_user(username='Other_reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.other_reader, author=cls.other_author)
+        Post.objects.create(text='Пост первого автора', author=cls.author)
+        Post.objects.create(text='Пост второго автора',
+                            author=cls.other_author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.other_reader_client = Client()
+        self.other_reader_client.force_login(self.other_reader)
+
+    def get_feed(self, client):
+        return client.get(reverse('posts:follow_index')).content.decode()
+
+    def test_follow_feed_cache_is_per_user(self):
+        '''Закэшированная лента подписок не показывается другим.'''
+        self.assertIn('Пост первого автора', self.get_feed(self.reader_client))
+        content = self.get_feed(self.other_reader_client)
+        self.assertIn('Пост второго автора', content)
+        self.assertNotIn('Пост первого автора', content)
+
+    def test_new_post_invalidates_follow_feed(self):
+        '''Новый пост автора сразу виден в кэшированной ленте подписчика.'''
+        self.get_feed(self.reader_client)
+        with run_on_commit():
+            Post.objects.create(text='Свежий пост', author=self.author)
+        self.assertIn('Свежий пост', self.get_feed(self.reader_client))
+
+    def test_new_post_does_not_bump_each_follower(self):
+        '''Пост меняет версию лент подписчиков без записи на каждого.'''
+        versions_before = (versions.follow_feed_version(self.reader.pk),
+                           versions.follow_feed_version(self.other_reader.pk))
+        with mock.patch('posts.versions.bump_follow_feed') as bump:
+            with run_on_commit():
+                Post.objects.create(text='Свежий пост', author=self.author)
+        bump.assert_not_called()
+        self.assertNotEqual(versions.follow_feed_version(self.reader.pk),
+                            versions_before[0])
+        self.assertEqual(versions.follow_feed_version(self.other_reader.pk),
+                         versions_before[1])
+
+    def test_follow_invalidates_follow_feed(self):
+        '''Подписка сразу меняет кэшированную ленту.'''
+        self.get_feed(self.reader_client)
+        with run_on_commit():
+            self.reader_client.get(reverse(
+                'posts:profile_follow', kwargs={'username': 'Other_author'}
+            ))
+        self.assertIn('Пост второго автора', self.get_feed(self.reader_client))
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Search_author')
+        cls.post = Post.objects.create(
+            text='Кошки спят <b>весь</b> день', author=cls.author
+        )
+        Post.objects.create(text='Собаки гуляют во дворе', author=cls.author)
+        Post.objects.create(
+            text='Кошки и кошки, снова кошки', author=cls.author
+        )
+
+    def search(self, query, **params):
+        return self.client.get(reverse('posts:search'),
+                               {'q': query, **params})
+
+    def found(self, query):
+        return [post.text for post in self.search(query).context['page']]
+
+    def test_search_ranks_and_highlights(self):
+        '''Выдача ранжирована, совпадения подсвечены, HTML экранирован.'''
+        response = self.search('кошки')
+        texts = [post.text for post in response.context['page']]
+        self.assertEqual(texts, ['Кошки и кошки, снова кошки',
+                                 'Кошки спят <b>весь</b> день'])
+        content = response.content.decode()
+        self.assertIn('<mark>Кошки</mark> спят &lt;b&gt;весь', content)
+
+    def test_search_index_follows_post_changes(self):
+        '''Индекс обновляется при изменении и удалении постов.'''
+        Post.objects.filter(pk=self.post.pk).update(text='Хомяки грызут')
+        self.assertEqual(self.found('хомяки'), ['Хомяки грызут'])
+        self.assertEqual(len(self.found('спят')), 0)
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(len(self.found('хомяки')), 0)
+
+    def test_search_query_is_sanitized(self):
+        '''Операторы FTS5 во вводе не ломают запрос, ищется префикс.'''
+        self.assertEqual(self.found('соба'), ['Собаки гуляют во дворе'])
+        self.assertEqual(len(self.found('"кошки*) -')), 2)
+        self.assertIsNone(self.search('*** ""').context['page'])
+
+    def test_search_is_paginated(self):
+        Post.objects.bulk_create(
+            Post(text=f'Попугай номер {number}', author=self.author)
+            for number in range(13)
+        )
+        first = self.search('попугай').context['page']
+        second = self.search('попугай', page=2).context['page']
+        self.assertEqual(first.paginator.count, 13)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 3)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            'Search_admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Собаки гуляют во дворе']
+        )
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'Changelist_admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='admin_group')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_posts(self, count):
+        start = User.objects.count()
+        for number in range(start, start + count):
+            author = User.objects.create_user(f'Admin_author_{number}')
+            post = Post.objects.create(text=f'Пост {number}', author=author,
+                                       group=self.group)
+            Comment.objects.create(post=post, author=author, text='Ответ')
+            Follow.objects.create(user=self.admin, author=author)
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model}_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        '''Число запросов списка не зависит от числа строк.'''
+        self.add_posts(2)
+        counts = {model: self.changelist_queries(model)
+                  for model in ('post', 'comment', 'follow')}
+        self.add_posts(6)
+        for model, count in counts.items():
+            with self.subTest(model=model):
+                self.assertEqual(self.changelist_queries(model), count)
+
+    def test_changelist_sql_has_no_full_scans_over_dates(self):
+        '''Ни агрегатов, ни DISTINCT по датам всех постов.'''
+        self.add_posts(3)
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for query in queries.captured_queries:
+            sql = query['sql'].upper()
+            with self.subTest(sql=sql):
+                self.assertNotIn('DJANGO_DATE_TRUNC', sql)
+                self.assertNotIn('DISTINCT', sql)
+                self.assertNotIn('MIN(', sql)
+                self.assertNotIn('MAX(', sql)
+
+    def test_changelist_count_is_capped(self):
+        self.add_posts(5)
+        with mock.patch.object(CappedCountPaginator, 'count_limit', 3):
+            response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+
+class AdminModerationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'Moderator', 'moderator@example.com', 'password'
+        )
+        cls.spammer = User.objects.create_user('Spammer')
+        cls.reader = User.objects.create_user('Spam_reader')
+        cls.group = Group.objects.create(title='Спам', slug='spam')
+        cls.other_group = Group.objects.create(title='Архив', slug='archive')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        Follow.objects.create(user=self.reader, author=self.spammer)
+        self.posts = [
+            Post.objects.create(text=f'Спам {number}', author=self.spammer,
+                                group=self.group)
+            for number in range(5)
+        ]
+        self.kept = Post.objects.create(text='Нормальный пост',
+                                        author=self.reader)
+        for post in self.posts[:2] + [self.kept]:
+            Comment.objects.create(post=post, author=self.spammer,
+                                   text='Купите')
+
+    def run_action(self, model, action, objects, **data):
+        return self.client.post(
+            reverse(f'admin:{model}_changelist'),
+            {'action': action,
+             '_selected_action': [obj.pk for obj in objects], **data},
+            follow=True
+        )
+
+    @mock.patch('posts.moderation.BATCH_SIZE', 2)
+    def test_delete_posts_in_batches(self):
+        response = self.run_action('posts_post', 'delete_in_batches',
+                                   self.posts[:4])
+        self.assertContains(response, 'Удалено: 4')
+        self.assertEqual(list(Post.objects.filter(author=self.spammer)),
+                         [self.posts[4]])
+        self.assertFalse(Comment.objects.filter(
+            post__in=self.posts[:2]).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__in=self.posts[:4]).exists())
+        self.assertEqual(counters.get_user_stats(self.spammer).posts_count, 1)
+
+    def test_delete_comments_updates_counts(self):
+        comment = Comment.objects.get(post=self.kept)
+        self.run_action('posts_comment', 'delete_in_batches', [comment])
+        self.kept.refresh_from_db()
+        self.assertEqual(self.kept.comment_count, 0)
+
+    def test_move_posts_to_group(self):
+        self.client.get(reverse('posts:group', args=['archive']))
+        self.run_action('posts_post', 'move_to_group', self.posts[:3],
+                        group=self.other_group.pk)
+        self.assertEqual(self.other_group.posts.count(), 3)
+        content = self.client.get(
+            reverse('posts:group', args=['archive'])
+        ).content.decode()
+        self.assertIn('Спам 0', content)
+
+    def test_purge_author_content(self):
+        stats = counters.get_user_stats(self.spammer)
+        self.assertEqual(stats.posts_count, 5)
+        response = self.run_action('auth_user', 'purge_content',
+                                   [self.spammer])
+        self.assertContains(response, 'Удалено постов: 5, комментариев: 3.')
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertFalse(Comment.objects.filter(author=self.spammer).exists())
+        self.assertTrue(User.objects.filter(pk=self.spammer.pk).exists())
+        self.kept.refresh_from_db()
+        self.assertEqual(self.kept.comment_count, 0)
+        self.assertEqual(counters.get_user_stats(self.spammer).posts_count, 0)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Cached_author')
+        cls.reader = User.objects.create_user(username='Cached_reader')
+        cls.group = Group.objects.create(title='Первая', slug='cached_one')
+        cls.other_group = Group.objects.create(title='Вторая',
+                                               slug='cached_two')
+        cls.post = Post.objects.create(text='Закэшированный пост',
+                                       author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group', args=['cached_one']),
+            'other_group': reverse('posts:group', args=['cached_two']),
+            'profile': reverse('posts:profile', args=['Cached_author']),
+            'post': reverse('posts:post',
+                            args=['Cached_author', self.post.pk]),
+        }
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def cached(self, name):
+        return self.client.get(self.urls[name])['X-Page-Cache'] == 'hit'
+
+    def test_anonymous_pages_are_cached(self):
+        for name in self.urls:
+            with self.subTest(page=name):
+                self.assertTrue(self.cached(name))
+        self.client.force_login(self.reader)
+        response = self.client.get(self.urls['index'])
+        self.assertNotIn('X-Page-Cache', response)
+
+    def test_new_post_purges_affected_pages(self):
+        with run_on_commit():
+            Post.objects.create(text='Новый пост', author=self.author,
+                                group=self.group)
+        for name in ('index', 'group', 'profile', 'post'):
+            with self.subTest(page=name):
+                self.assertFalse(self.cached(name))
+        self.assertTrue(self.cached('other_group'))
+        self.assertIn('Новый пост',
+                      self.client.get(self.urls['group']).content.decode())
+
+    def test_comment_and_follow_purge_pages(self):
+        with run_on_commit():
+            Comment.objects.create(post=self.post, author=self.reader,
+                                   text='Комментарий')
+        self.assertIn('Комментарий',
+                      self.client.get(self.urls['post']).content.decode())
+        self.assertTrue(self.cached('post'))
+        with run_on_commit():
+            Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(self.cached('profile'))
+        self.assertTrue(self.cached('other_group'))
+
+    def test_hit_and_miss_counters(self):
+        pagecache.reset_stats()
+        self.client.get(self.urls['index'])
+        self.client.get(reverse('posts:index'), {'cursor': 'unknown'})
+        output = StringIO()
+        call_command('page_cache_stats', '--reset', stdout=output)
+        self.assertEqual(json.loads(output.getvalue()),
+                         {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+        self.assertEqual(pagecache.stats()['hits'], 0)
+
+    def test_counters_batched_per_process(self):
+        pagecache.reset_stats()
+        pagecache.flush()
+        with mock.patch('posts.pagecache.stats_cache') as stats_cache:
+            self.client.get(self.urls['index'])
+            self.client.get(self.urls['group'])
+        stats_cache.assert_not_called()
+        self.assertEqual(pagecache.stats()['hits'], 2)
+
+    def test_counters_visible_from_other_process(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        file_caches = {**settings.CACHES, 'metrics': {
+            'BACKEND': 'yatube.cache.FileCache', 'LOCATION': directory,
+        }}
+        with override_settings(CACHES=file_caches,
+                               PAGE_CACHE_STATS_CACHE='metrics'):
+            self.client.get(self.urls['index'])
+            pagecache.flush()
+        fresh = FileCache(directory, {})
+        with mock.patch('posts.pagecache.stats_cache', return_value=fresh):
+            self.assertEqual(pagecache.stats()['hits'], 1)
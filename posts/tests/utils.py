@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def run_on_commit():
+    '''Выполняет колбэки transaction.on_commit() из блока.
+
+    TestCase не коммитит транзакции, и колбэки не вызываются; аналог
+    captureOnCommitCallbacks(execute=True), которого нет в Django 2.2.
+    '''
+    start = len(connection.run_on_commit)
+    yield
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for _, callback in callbacks:
+        callback()
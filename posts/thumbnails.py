@@ -0,0 +1,106 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from . import derivatives, versions
+from .models import Post, ThumbnailJob
+
+MAX_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def schedule(post):
+    '''Сбрасывает миниатюры поста и ставит задание на новые.
+
+    Вызывается после сохранения поста с новой картинкой. Задание уходит
+    воркеру после коммита транзакции, до этого шаблоны показывают заглушку.
+    '''
+    Post.objects.filter(pk=post.pk).update(thumbnail='')
+    post.thumbnail = ''
+    if not post.image:
+        return None
+    job = ThumbnailJob.objects.create(post=post, image=post.image.name)
+    transaction.on_commit(lambda: submit(job.pk))
+    return job
+
+
+def submit(job_pk):
+    if getattr(settings, 'THUMBNAIL_ASYNC', True):
+        get_executor().submit(run_in_worker, job_pk)
+    else:
+        process(job_pk)
+
+
+def run_in_worker(job_pk):
+    try:
+        process(job_pk)
+    except Exception:
+        logger.exception('Thumbnail job %s crashed', job_pk)
+    finally:
+        # У потока воркера своё соединение с БД, закрываем его сами.
+        connection.close()
+
+
+def process(job_pk):
+    '''Выполняет задание, если его ещё не забрал другой воркер.'''
+    claimed = ThumbnailJob.objects.filter(
+        pk=job_pk, status=ThumbnailJob.PENDING
+    ).update(status=ThumbnailJob.RUNNING, attempts=F('attempts') + 1)
+    if not claimed:
+        return False
+    job = ThumbnailJob.objects.select_related('post').get(pk=job_pk)
+    jobs = ThumbnailJob.objects.filter(pk=job_pk)
+    if job.post.image.name != job.image:
+        # Картинку успели заменить, для новой есть своё задание.
+        jobs.update(status=ThumbnailJob.DONE)
+        return False
+    try:
+        prefix = derivatives.render(job.image)
+    except Exception as error:
+        logger.exception('Thumbnail job %s failed', job_pk)
+        status = (ThumbnailJob.FAILED if job.attempts >= MAX_ATTEMPTS
+                  else ThumbnailJob.PENDING)
+        jobs.update(status=status, error=str(error))
+        return False
+    updated = Post.objects.filter(pk=job.post_id, image=job.image).update(
+        thumbnail=prefix
+    )
+    if updated:
+        # Закэшированные страницы показывают заглушку вместо картинки
+        versions.bump_post_feeds(job.post.author_id, (job.post.group_id,))
+    jobs.update(status=ThumbnailJob.DONE, error='')
+    return True
+
+
+def requeue_running():
+    '''Возвращает в очередь задания, брошенные упавшими воркерами.'''
+    return ThumbnailJob.objects.filter(
+        status=ThumbnailJob.RUNNING
+    ).update(status=ThumbnailJob.PENDING)
+
+
+def process_pending(limit=None):
+    pending = ThumbnailJob.objects.filter(
+        status=ThumbnailJob.PENDING
+    ).order_by('created').values_list('pk', flat=True)
+    if limit is not None:
+        pending = pending[:limit]
+    return sum(process(job_pk) for job_pk in list(pending))
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, Post, TimelineEntry
+
+TIMELINE_LENGTH = getattr(settings, 'POSTS_TIMELINE_LENGTH', 1000)
+BATCH_SIZE = 500
+
+
+def entry_for(user_id, post):
+    return TimelineEntry(user_id=user_id, post_id=post.pk,
+                         author_id=post.author_id, pub_date=post.pub_date)
+
+
+def fan_out(post):
+    '''Добавляет новый пост в ленты всех подписчиков автора.'''
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (entry_for(user_id, post) for user_id in followers.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def backfill(user_id, author_id):
+    '''Переносит в ленту подписчика последние посты автора.'''
+    posts = Post.objects.filter(author_id=author_id).only(
+        'author', 'pub_date'
+    )[:TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (entry_for(user_id, post) for post in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def remove(user_id, author_id):
+    '''Убирает из ленты подписчика посты автора.'''
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_user(user_id):
+    '''Пересобирает ленту одного подписчика в одной транзакции.
+
+    Возвращает число обработанных подписок.
+    '''
+    with transaction.atomic():
+        author_ids = list(Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True))
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        for author_id in author_ids:
+            backfill(user_id, author_id)
+    return len(author_ids)
+
+
+def rebuild(user_ids=None):
+    '''Пересобирает ленты подписок. Возвращает число обработанных подписок.
+
+    Каждая лента пересобирается в своей транзакции, так что читатели
+    не видят её пустой. Без user_ids - ленты всех подписчиков.
+    '''
+    if user_ids is None:
+        TimelineEntry.objects.exclude(
+            user_id__in=Follow.objects.values('user_id')
+        ).delete()
+        user_ids = Follow.objects.order_by('user_id').values_list(
+            'user_id', flat=True
+        ).distinct().iterator()
+    return sum(rebuild_user(user_id) for user_id in user_ids)
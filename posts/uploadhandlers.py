@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image, ImageFile
+
+# Заголовки распространённых форматов укладываются в первые килобайты
+HEADER_LIMIT = 64 * 1024
+
+
+def check_dimensions(size):
+    '''Сообщение об ошибке, если картинка слишком велика по пикселям.'''
+    width, height = size
+    if width * height > settings.MAX_IMAGE_PIXELS:
+        return (f'Картинка слишком большая: {width}x{height} пикселей. '
+                f'Допустимо не больше {settings.MAX_IMAGE_PIXELS} пикселей.')
+    return None
+
+
+class ImageLimitUploadHandler(FileUploadHandler):
+    '''Отбрасывает слишком большие загрузки, пока они ещё идут.
+
+    Считает байты по мере поступления и разбирает только заголовок
+    картинки, чтобы узнать её размер, не декодируя пиксели. Файл,
+    нарушивший ограничение, пропускается, а причина сохраняется
+    в request.upload_errors для формы. Данные передаются дальше
+    стандартным обработчикам без копирования.
+    '''
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+        self.parser = ImageFile.Parser()
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = {}
+        if self.content_length and (
+                self.content_length > settings.MAX_IMAGE_UPLOAD_SIZE):
+            self.reject(self.size_error())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_IMAGE_UPLOAD_SIZE:
+            self.reject(self.size_error())
+        if self.parser is not None:
+            self.sniff(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def sniff(self, raw_data):
+        try:
+            self.parser.feed(raw_data)
+        except Image.DecompressionBombError:
+            self.reject('Картинка слишком большая для обработки.')
+        except Exception:
+            # Не разобрали заголовок - решит валидация формы
+            self.parser = None
+            return
+        if self.parser.image is not None:
+            error = check_dimensions(self.parser.image.size)
+            self.parser = None
+            if error:
+                self.reject(error)
+        elif self.received > HEADER_LIMIT:
+            self.parser = None
+
+    def size_error(self):
+        limit = settings.MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)
+        return f'Файл слишком большой. Допустимо не больше {limit} МБ.'
+
+    def reject(self, message):
+        self.request.upload_errors[self.field_name] = message
+        self.parser = None
+        raise SkipFile
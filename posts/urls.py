@@ -1,14 +1,25 @@
 from django.urls import path
 
 from . import views
+from .feeds import AuthorFeed, GroupFeed, IndexFeed
 
 app_name = 'posts'
 
 urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group'),
+    path('group/<slug:slug>/rss/', GroupFeed('rss'), name='group_rss'),
+    path('group/<slug:slug>/atom/', GroupFeed('atom'), name='group_atom'),
+    # Адреса вида <имя>/ и <имя>/rss/ заняты профилями, поэтому общие
+    # страницы живут глубже и не отнимают профиль у пользователей
+    # с именами rss, atom, search или feeds
+    path('feeds/index/rss/', IndexFeed('rss'), name='index_rss'),
+    path('feeds/index/atom/', IndexFeed('atom'), name='index_atom'),
+    path('posts/search/', views.search_posts, name='search'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
     path('<str:username>/', views.profile, name='profile'),
+    path('<str:username>/rss/', AuthorFeed('rss'), name='profile_rss'),
+    path('<str:username>/atom/', AuthorFeed('atom'), name='profile_atom'),
     path('<str:username>/<int:post_id>/edit/',
          views.post_edit, name='post_edit'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
@@ -0,0 +1,9 @@
+def batched(objects, batch_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,96 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from .models import Follow
+
+
+INDEX_KEY = 'posts:index_version'
+
+
+def group_key(group_id):
+    return f'posts:group_version:{group_id}'
+
+
+def profile_key(author_id):
+    return f'posts:profile_version:{author_id}'
+
+
+def author_key(author_id):
+    return f'posts:author_version:{author_id}'
+
+
+def follow_feed_key(user_id):
+    return f'posts:follow_feed_version:{user_id}'
+
+
+def get_version(key):
+    '''Текущая версия ключа; создаёт её, если версии ещё нет.'''
+    version = cache.get(key)
+    if version is None:
+        # Начальное значение из времени, а не 1: после вытеснения ключа
+        # из кэша версия не совпадёт ни с одной из уже выданных.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def index_version():
+    return get_version(INDEX_KEY)
+
+
+def group_version(group_id):
+    return get_version(group_key(group_id))
+
+
+def profile_version(author_id):
+    return get_version(profile_key(author_id))
+
+
+def follow_feed_version(user_id):
+    '''Версия ленты подписок: своя версия пользователя и версии авторов.
+
+    Пост автора меняет только версию автора, а не версии всех его
+    подписчиков: ленты подписчиков сбрасываются через этот составной
+    ключ. Своя версия меняется при подписке и пересборке ленты.
+    '''
+    author_ids = Follow.objects.filter(
+        user_id=user_id
+    ).order_by('author_id').values_list('author_id', flat=True)
+    keys = [follow_feed_key(user_id)] + [author_key(pk) for pk in author_ids]
+    known = cache.get_many(keys)
+    parts = [f'{key}={known[key] if key in known else get_version(key)}'
+             for key in keys]
+    return hashlib.md5(';'.join(parts).encode()).hexdigest()
+
+
+def bump_profile(user_id):
+    bump_version(profile_key(user_id))
+
+
+def bump_follow_feed(user_id):
+    bump_version(follow_feed_key(user_id))
+
+
+def bump_post_feeds(author_id, group_ids=()):
+    '''Сбрасывает кэш всех лент, в которых виден пост автора.'''
+    bump_version(INDEX_KEY)
+    bump_version(profile_key(author_id))
+    bump_version(author_key(author_id))
+    for group_id in set(group_ids):
+        if group_id is not None:
+            bump_version(group_key(group_id))
+
+
+def bump_feeds(feeds):
+    '''feeds: {author_id: {group_id, ...}} затронутых постов.'''
+    for author_id, group_ids in feeds.items():
+        bump_post_feeds(author_id, group_ids)
@@ -1,71 +1,107 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
+from yatube.db import atomic_write
+
 from .forms import CommentForm, PostForm
-from .models import Group, Post, Follow
+from .models import Follow, Group, Post, TimelineEntry
+from .paginator import KeysetPaginator
+from . import counters, pagecache, search, thumbnails, versions
 
 User = get_user_model()
 
 
+@pagecache.cache_anonymous(pagecache.index_version)
 def index(request):
-    latest = Post.objects.all()
-    paginator = Paginator(latest, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'posts/index.html', {'page': page})
+    latest = Post.objects.for_feed()
+    paginator = KeysetPaginator(latest, 10)
+    page = paginator.get_lazy_page(request.GET.get('cursor'))
+    return render(request, 'posts/index.html',
+                  {'page': page,
+                   'feed_version': versions.index_version(),
+                   'cache_timeout': settings.FEED_CACHE_TIMEOUT})
 
 
+@pagecache.cache_anonymous(pagecache.group_version)
 def group_posts(request, slug):
     '''Для постов конкретной группы'''
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 5)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = group.posts.for_feed()
+    paginator = KeysetPaginator(posts, 5)
+    page = paginator.get_lazy_page(request.GET.get('cursor'))
     return render(request,
                   'posts/group.html',
-                  {'group': group, 'page': page})
+                  {'group': group,
+                   'page': page,
+                   'feed_version': versions.group_version(group.pk),
+                   'cache_timeout': settings.FEED_CACHE_TIMEOUT})
+
+
+def search_posts(request):
+    '''Полнотекстовый поиск по постам'''
+    query = request.GET.get('q', '').strip()
+    expression = search.match_expression(query)
+    page = None
+    if expression is not None:
+        results = search.SearchResults(expression, Post.objects.for_feed())
+        paginator = Paginator(results, 10)
+        page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'posts/search.html',
+                  {'query': query, 'page': page})
 
 
 @login_required
 def new_post(request):
-    form = PostForm(request.POST or None, files=request.FILES or None)
+    form = PostForm(request.POST or None, files=request.FILES or None,
+                    upload_errors=getattr(request, 'upload_errors', None))
     if request.method == 'POST' and form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        if post.image and not post.image._committed:
+            # Файл пишем до транзакции, чтобы не держать блокировку
+            # записи базы, пока идёт работа с диском
+            post.image.save(post.image.name, post.image.file, save=False)
+        # Пост, ленты подписчиков и счётчики - одна транзакция записи
+        with atomic_write():
+            post.save()
+        if post.image:
+            thumbnails.schedule(post)
         return redirect(reverse('posts:index'))
     return render(request, 'posts/new.html', {'form': form})
 
 
+@pagecache.cache_anonymous(pagecache.author_version)
 def profile(request, username):
     following = False
     author = get_object_or_404(User, username=username)
-    posts_author = author.posts.all()
-    paginator = Paginator(posts_author, 5)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts_author = author.posts.for_feed()
+    paginator = KeysetPaginator(posts_author, 5)
+    page = paginator.get_lazy_page(request.GET.get('cursor'))
     if request.user.is_authenticated:
         following = Follow.objects.filter(user=request.user,
                                           author=author).exists()
     return render(request, 'posts/profile.html',
                   {'author': author,
+                   'stats': counters.get_user_stats(author),
                    'following': following,
-                   'page': page})
+                   'page': page,
+                   'feed_version': versions.profile_version(author.pk),
+                   'cache_timeout': settings.FEED_CACHE_TIMEOUT})
 
 
+@pagecache.cache_anonymous(pagecache.post_version)
 def post_view(request, username, post_id):
     form = CommentForm()
     author = get_object_or_404(User, username=username)
-    posts_author = author.posts.all()
     post = get_object_or_404(Post, id=post_id)
     comments = post.comments.all()
     return render(request, 'posts/post.html',
                   {'author': author,
-                   'posts_author': posts_author,
+                   'stats': counters.get_user_stats(author),
                    'post': post,
                    'comments': comments,
                    'form': form}
@@ -81,10 +117,13 @@ def post_edit(request, username, post_id):
         form = PostForm(
             request.POST or None,
             files=request.FILES or None,
-            instance=post
+            instance=post,
+            upload_errors=getattr(request, 'upload_errors', None)
         )
         if request.method == 'POST' and form.is_valid():
-            form.save()
+            post = form.save()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
             return redirect(reverse('posts:post', kwargs=post_kwargs))
         return render(request, 'posts/new.html', {'form': form, 'post': post})
     return redirect(reverse('posts:post', kwargs=post_kwargs))
@@ -112,18 +151,30 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.post = post
         comment.author = request.user
-        comment.save()
+        with atomic_write():
+            comment.save()
     return redirect(reverse('posts:post', kwargs=post_kwargs))
 
 
 @login_required
 def follow_index(request):
     '''Для страницы Избранных авторов'''
-    latest = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(latest, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'posts/follow.html', {'page': page})
+    entries = TimelineEntry.objects.filter(user=request.user).order_by(
+        '-pub_date', '-post_id'
+    )
+    paginator = KeysetPaginator(entries, 10, keys=('pub_date', 'post_id'))
+    page = paginator.get_page(request.GET.get('cursor'))
+    posts = Post.objects.for_feed().in_bulk(
+        [entry.post_id for entry in page]
+    )
+    page.object_list = [posts[entry.post_id] for entry in page
+                        if entry.post_id in posts]
+    return render(request, 'posts/follow.html',
+                  {'page': page,
+                   'feed_version': versions.follow_feed_version(
+                       request.user.pk
+                   ),
+                   'cache_timeout': settings.FEED_CACHE_TIMEOUT})
 
 
 @login_required
@@ -131,13 +182,16 @@ def profile_follow(request, username):
     user = get_object_or_404(User, username=request.user.username)
     author = get_object_or_404(User, username=username)
     if user != author:
-        Follow.objects.get_or_create(user=user,
-                                     author=author)
+        # Подписка, лента подписчика и счётчики - одна транзакция записи
+        with atomic_write():
+            Follow.objects.get_or_create(user=user,
+                                         author=author)
     return redirect(reverse('posts:profile', kwargs={'username': author}))
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    with atomic_write():
+        Follow.objects.filter(user=request.user, author=author).delete()
     return redirect(reverse('posts:profile', kwargs={'username': author}))
@@ -1,4 +1,14 @@
+import pytest
+from django.core.cache import cache
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Тест не коммитит транзакцию, версии кэша меняются только после
+    # коммита, поэтому страницы прошлого теста остались бы в кэше
+    cache.clear()
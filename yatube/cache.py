@@ -0,0 +1,224 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+_missing = object()
+
+
+class FileCache(FileBasedCache):
+    '''Файловый кэш, общий для процессов, с атомарными add() и incr().
+
+    В FileBasedCache add() - это has_key() и set() подряд, а incr() -
+    get() и set(): два процесса могут оба взять одну блокировку
+    или потерять прибавку счётчика. Здесь обе операции выполняются
+    под файловой блокировкой каталога кэша.
+    '''
+    lock_name = 'cache.lock'
+
+    @contextmanager
+    def locked(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.lock_name), 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self.locked():
+            return super().incr(key, delta, version)
+
+
+class LocalTier:
+    '''Ограниченный LRU-кэш процесса со сроком жизни записей.
+
+    Значения хранятся сериализованными, как в LocMemCache: так их
+    нельзя случайно изменить по ссылке, а размер легко посчитать.
+    '''
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return False, None
+            self.entries.move_to_end(key)
+        return True, pickle.loads(data)
+
+    def set(self, key, value, timeout):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self._pop(key)
+            if len(data) > self.max_bytes:
+                return
+            self.entries[key] = (time.monotonic() + timeout, data)
+            self.size += len(data)
+            while (len(self.entries) > self.max_entries
+                   or self.size > self.max_bytes):
+                self._pop(next(iter(self.entries)))
+
+    def delete(self, key):
+        with self.lock:
+            self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class TwoTierCache(BaseCache):
+    '''Кэш процесса поверх общего кэша.
+
+    В памяти процесса держатся только ключи с префиксами из
+    LOCAL_PREFIXES. Это ключи со встроенной версией ленты: при
+    изменении данных меняется сам ключ, поэтому копии в других
+    процессах не нужно сбрасывать, они просто перестают
+    запрашиваться. Остальные ключи, в том числе сами версии и
+    счётчики, всегда читаются из общего кэша SHARED.
+
+    OPTIONS: SHARED - имя общего кэша в CACHES, LOCAL_PREFIXES,
+    LOCAL_TIMEOUT - сколько секунд держать копию в процессе,
+    LOCAL_MAX_ENTRIES и LOCAL_MAX_BYTES - размер кэша процесса.
+    '''
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options['SHARED']
+        self.prefixes = tuple(options.get('LOCAL_PREFIXES', ()))
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        # Экземпляры бэкенда создаются на каждый поток, а кэш
+        # процесса у них общий, как у LocMemCache.
+        with _tiers_lock:
+            self.local = _tiers.setdefault(location, LocalTier(
+                options.get('LOCAL_MAX_ENTRIES', 1000),
+                options.get('LOCAL_MAX_BYTES', 32 * 1024 * 1024),
+            ))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def is_local(self, key):
+        return bool(self.prefixes) and key.startswith(self.prefixes)
+
+    def local_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def remember(self, key, value, timeout, version):
+        ttl = self.local_ttl(timeout)
+        if ttl > 0:
+            self.local.set((key, version), value, ttl)
+        else:
+            self.local.delete((key, version))
+
+    def get(self, key, default=None, version=None):
+        if self.is_local(key):
+            hit, value = self.local.get((key, version))
+            if hit:
+                return value
+        value = self.shared.get(key, _missing, version=version)
+        if value is _missing:
+            return default
+        if self.is_local(key):
+            self.remember(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            hit, value = (self.local.get((key, version))
+                          if self.is_local(key) else (False, None))
+            if hit:
+                found[key] = value
+            else:
+                remote.append(key)
+        if remote:
+            fetched = self.shared.get_many(remote, version=version)
+            for key, value in fetched.items():
+                if self.is_local(key):
+                    self.remember(key, value, DEFAULT_TIMEOUT, version)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        if self.is_local(key):
+            self.remember(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if self.is_local(key) and key not in failed:
+                self.remember(key, value, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # add() служит для блокировок и счётчиков: решает общий кэш
+        self.local.delete((key, version))
+        return self.shared.add(key, value, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete((key, version))
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete((key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete((key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.local.delete((key, version))
+        return self.shared.decr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        if self.is_local(key) and self.local.get((key, version))[0]:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
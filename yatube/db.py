@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def atomic_write(using=None):
+    '''transaction.atomic() для блоков, которые пишут в базу.
+
+    На SQLite (бэкенд yatube.sqlite) внешняя транзакция открывается
+    BEGIN IMMEDIATE: блокировка записи берётся сразу, и конкурирующий
+    писатель ждёт её в пределах timeout, а не получает
+    "database is locked" при первой записи. Читающие транзакции
+    остаются обычными и не встают в очередь за писателями. Внутри уже
+    открытой транзакции работает как обычный atomic().
+    '''
+    connection = transaction.get_connection(using)
+    outermost = not connection.in_atomic_block
+    if outermost:
+        connection.write_transaction = True
+    try:
+        with transaction.atomic(using=using):
+            connection.write_transaction = False
+            yield
+    finally:
+        connection.write_transaction = False
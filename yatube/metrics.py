@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.backends.django import DjangoTemplates, Template
+
+# Границы корзин гистограмм. Время хранится в микросекундах, чтобы
+# суммы можно было накапливать через cache.incr().
+HISTOGRAMS = {
+    'duration': (5000, 10000, 25000, 50000, 100000, 250000, 500000,
+                 1000000, 2500000),
+    'db_time': (1000, 5000, 10000, 25000, 50000, 100000, 250000, 1000000),
+    'template_time': (1000, 5000, 10000, 25000, 50000, 100000, 250000),
+    'queries': (1, 2, 5, 10, 20, 50, 100, 200),
+    'response_size': (1024, 4096, 16384, 65536, 262144, 1048576),
+}
+TIME_METRICS = ('duration', 'db_time', 'template_time')
+KEY_PREFIX = 'metrics'
+NAMES_KEY = f'{KEY_PREFIX}:names'
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+def start_request():
+    _local.current = RequestMetrics()
+    return _local.current
+
+
+def finish_request():
+    _local.current = None
+
+
+def current():
+    return getattr(_local, 'current', None)
+
+
+def track_query(execute, sql, params, many, context):
+    '''execute_wrapper для соединений с БД.'''
+    metrics = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.db_time += time.perf_counter() - started
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    '''Движок шаблонов Django, замеряющий время отрисовки.
+
+    Замеряется только шаблон верхнего уровня, include входят в его время.
+    '''
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template,
+                             self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template,
+                             self)
+
+
+def metric_key(name, metric, field):
+    return f'{KEY_PREFIX}:{name}:{metric}:{field}'
+
+
+def bucket_for(metric, value):
+    for bound in HISTOGRAMS[metric]:
+        if value <= bound:
+            return bound
+    return 'inf'
+
+
+class MetricsRegistry:
+    '''Копит гистограммы в процессе и периодически сливает их в кэш.
+
+    Общий для всех процессов кэш (memcached, файловый) позволяет
+    команде dump_request_metrics видеть сумму по всем воркерам.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(int)
+        self.names = set()
+        self.last_flush = time.monotonic()
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'REQUEST_METRICS_CACHE', 'default')]
+
+    def observe(self, name, values):
+        with self.lock:
+            self.names.add(name)
+            for metric, value in values.items():
+                value = int(value)
+                self.pending[metric_key(name, metric, 'count')] += 1
+                self.pending[metric_key(name, metric, 'sum')] += value
+                bucket = bucket_for(metric, value)
+                self.pending[metric_key(name, metric, bucket)] += 1
+        interval = getattr(settings, 'REQUEST_METRICS_FLUSH_INTERVAL', 10)
+        if time.monotonic() - self.last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(int)
+            names, self.names = self.names, set()
+            self.last_flush = time.monotonic()
+        cache = self.cache
+        for key, delta in pending.items():
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                if not cache.add(key, delta, None):
+                    cache.incr(key, delta)
+        if names:
+            known = cache.get(NAMES_KEY, set())
+            if not names <= known:
+                cache.set(NAMES_KEY, known | names, None)
+
+    def snapshot(self):
+        '''Сводка из кэша: {url name: {метрика: count, mean, buckets}}.'''
+        self.flush()
+        cache = self.cache
+        report = {}
+        for name in sorted(cache.get(NAMES_KEY, set())):
+            report[name] = {}
+            for metric, bounds in HISTOGRAMS.items():
+                fields = ['count', 'sum', *bounds, 'inf']
+                stored = cache.get_many(
+                    [metric_key(name, metric, field) for field in fields]
+                )
+                count = stored.get(metric_key(name, metric, 'count'), 0)
+                if not count:
+                    continue
+                scale = 1000 if metric in TIME_METRICS else 1
+                total = stored.get(metric_key(name, metric, 'sum'), 0)
+                report[name][metric] = {
+                    'count': count,
+                    'mean': round(total / count / scale, 3),
+                    'buckets': {
+                        str(bound if bound == 'inf' else bound / scale):
+                        stored.get(metric_key(name, metric, bound), 0)
+                        for bound in (*bounds, 'inf')
+                    },
+                }
+        return report
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+        cache = self.cache
+        keys = [
+            metric_key(name, metric, field)
+            for name in cache.get(NAMES_KEY, set())
+            for metric, bounds in HISTOGRAMS.items()
+            for field in ('count', 'sum', *bounds, 'inf')
+        ]
+        cache.delete_many(keys + [NAMES_KEY])
+
+
+registry = MetricsRegistry()
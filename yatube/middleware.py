@@ -0,0 +1,54 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+
+class RequestMetricsMiddleware:
+    '''Считает запросы к БД, время БД и шаблонов, размер ответа.
+
+    Включается настройкой REQUEST_METRICS_ENABLED. Значения отдаются
+    в заголовке Server-Timing и копятся в гистограммах по имени URL.
+    '''
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        current = metrics.start_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.track_query)
+                    )
+                response = self.get_response(request)
+            duration = time.perf_counter() - current.started
+            self.record(request, response, current, duration)
+        finally:
+            metrics.finish_request()
+        return response
+
+    def record(self, request, response, current, duration):
+        match = request.resolver_match
+        name = match.view_name if match else 'unresolved'
+        size = (0 if response.streaming else len(response.content))
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={current.db_time * 1000:.1f};'
+            f'desc="{current.queries} queries"',
+            f'tpl;dur={current.template_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        metrics.registry.observe(name, {
+            'duration': duration * 1000000,
+            'db_time': current.db_time * 1000000,
+            'template_time': current.template_time * 1000000,
+            'queries': current.queries,
+            'response_size': size,
+        })
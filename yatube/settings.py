@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,7 +62,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,8 +85,24 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            # Сколько секунд писатель ждёт чужую блокировку записи.
+            # Блоки записи (yatube.db.atomic_write) берут её сразу
+            # и ждут в очереди, а не падают с "database is locked".
+            'timeout': 20,
+            # WAL: чтение не блокирует запись и наоборот.
+            # NORMAL в WAL не теряет целостность, только последние
+            # транзакции при сбое питания.
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'cache_size': -64000,  # в КиБ, около 64 МБ
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
     }
 }
 
@@ -143,8 +161,87 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 
-CACHES = {
-    'default': {
+# Горячие фрагменты, страницы и ленты берутся из памяти процесса,
+# остальное - из общего для всех воркеров кэша 'shared'. В нём живут
+# счётчики версий, которые меняются при каждой записи, поэтому это
+# memcached из MEMCACHED_LOCATION; без него (один процесс разработки)
+# - память процесса. Файловый кэш с чисткой по MAX_ENTRIES для версий
+# не годится: каждая запись в нём перечисляет весь каталог.
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+# Тесты не должны трогать кэш и метрики запущенного сайта
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION')
+if MEMCACHED_LOCATION and not TESTING:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': MEMCACHED_LOCATION.split(','),
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+if TESTING:
+    METRICS_CACHE = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'metrics',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 1000000},
+    }
+else:
+    # Ключей немного (счётчики и гистограммы по именам URL), поэтому
+    # предел с запасом: случайная чистка не должна терять счётчики
+    METRICS_CACHE = {
+        'BACKEND': 'yatube.cache.FileCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'metrics'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 1000000},
     }
+CACHES = {
+    'default': {
+        'BACKEND': 'yatube.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_PREFIXES': ('template.cache.', 'posts:page:',
+                               'posts:feed:'),
+            'LOCAL_TIMEOUT': 5,
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_MAX_BYTES': 32 * 1024 * 1024,
+        },
+    },
+    'shared': SHARED_CACHE,
+    # Гистограммы и счётчики для мониторинга: на диске, чтобы их
+    # видели команды управления и не вытеснял memcached
+    'metrics': METRICS_CACHE,
 }
+
+# Кэш лент сбрасывается по версии, поэтому может жить часами
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Кэш целых страниц для анонимных посетителей. Ключи версионные,
+# устаревшие страницы просто перестают запрашиваться.
+PAGE_CACHE_TIMEOUT = 60 * 10
+# Попадания и промахи кэша страниц, общие для всех воркеров
+PAGE_CACHE_STATS_CACHE = 'metrics'
+PAGE_CACHE_STATS_FLUSH_INTERVAL = 10
+
+# Метрики запросов: Server-Timing и гистограммы по имени URL.
+# Для сводки по всем воркерам нужен общий кэш.
+REQUEST_METRICS_ENABLED = False
+REQUEST_METRICS_CACHE = 'metrics'
+REQUEST_METRICS_FLUSH_INTERVAL = 10
+
+# Миниатюры картинок постов создаются в фоновых потоках
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+# Ограничения на загружаемые картинки проверяются ещё во время загрузки
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40000000
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploadhandlers.ImageLimitUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
@@ -0,0 +1,56 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def configure(connection, pragmas):
+    '''Выполняет PRAGMA на соединении в порядке словаря.'''
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+def begin_statement(mode):
+    if mode is None:
+        return 'BEGIN'
+    mode = mode.upper()
+    if mode not in TRANSACTION_MODES:
+        raise ImproperlyConfigured(
+            f'Unknown SQLite transaction_mode {mode!r}, '
+            f'expected one of {", ".join(TRANSACTION_MODES)}'
+        )
+    return f'BEGIN {mode}'
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    '''Стандартный бэкенд SQLite с настройками для конкурентной нагрузки.
+
+    В OPTIONS, кроме параметров sqlite3.connect (timeout - сколько
+    секунд ждать чужую блокировку), понимает:
+    pragmas - словарь PRAGMA для каждого нового соединения
+    (journal_mode, synchronous, cache_size, mmap_size, temp_store...);
+    transaction_mode - каким BEGIN открывать transaction.atomic(),
+    по умолчанию обычный BEGIN.
+
+    Блоки записи открываются через yatube.db.atomic_write() с BEGIN
+    IMMEDIATE независимо от transaction_mode.
+    '''
+    write_transaction = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        configure(connection, self.settings_dict['OPTIONS'].get('pragmas', {}))
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.write_transaction:
+            mode = 'IMMEDIATE'
+        else:
+            mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(begin_statement(mode))
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from .base import begin_statement, configure
+
+SCHEMA = '''
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL, text TEXT,
+    pub_date REAL NOT NULL, comment_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX post_pub_date ON post (pub_date, id);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL, text TEXT, created REAL NOT NULL
+);
+CREATE INDEX comment_post ON comment (post_id);
+CREATE TABLE stats (
+    user_id INTEGER PRIMARY KEY, posts_count INTEGER NOT NULL
+);
+'''
+AUTHORS = 100
+# Стандартный бэкенд Django: журнал отката, обычный BEGIN
+STOCK = {'timeout': 5, 'pragmas': {}}
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[round(percent / 100 * (len(ordered) - 1))]
+
+
+def connect(path, options):
+    connection = sqlite3.connect(path, timeout=options.get('timeout', 5),
+                                 isolation_level=None,
+                                 check_same_thread=False)
+    configure(connection, options.get('pragmas', {}))
+    return connection
+
+
+def seed(path, options, rows):
+    connection = connect(path, options)
+    connection.executescript(SCHEMA)
+    now = time.time()
+    connection.execute('BEGIN')
+    connection.executemany(
+        'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+        ((i % AUTHORS, 'Текст поста ' * 20, now - i) for i in range(rows)),
+    )
+    connection.executemany(
+        'INSERT INTO stats VALUES (?, ?)',
+        ((author, rows // AUTHORS) for author in range(AUTHORS)),
+    )
+    connection.execute('COMMIT')
+    connection.close()
+
+
+def read_feed(connection, step):
+    '''Страница ленты и комментарии поста, как index и post_view.'''
+    posts = connection.execute(
+        'SELECT id, author_id, text FROM post '
+        'ORDER BY pub_date DESC, id DESC LIMIT 10 OFFSET ?',
+        (step % 10 * 10,),
+    ).fetchall()
+    if posts:
+        connection.execute(
+            'SELECT id, text FROM comment WHERE post_id = ?', (posts[0][0],)
+        ).fetchall()
+
+
+def new_post(connection, step):
+    '''Пост и счётчик автора, как new_post с сигналами: сначала чтение.'''
+    author = step % AUTHORS
+    connection.execute('SELECT posts_count FROM stats WHERE user_id = ?',
+                       (author,)).fetchone()
+    connection.execute(
+        'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+        (author, 'Новый пост', time.time()),
+    )
+    connection.execute(
+        'UPDATE stats SET posts_count = posts_count + 1 WHERE user_id = ?',
+        (author,),
+    )
+
+
+def add_comment(connection, step):
+    post_id = connection.execute(
+        'SELECT id FROM post ORDER BY pub_date DESC LIMIT 1'
+    ).fetchone()[0]
+    connection.execute(
+        'INSERT INTO comment (post_id, author_id, text, created) '
+        'VALUES (?, ?, ?, ?)',
+        (post_id, step % AUTHORS, 'Комментарий', time.time()),
+    )
+    connection.execute(
+        'UPDATE post SET comment_count = comment_count + 1 WHERE id = ?',
+        (post_id,),
+    )
+
+
+def write(connection, begin, step):
+    connection.execute(begin)
+    try:
+        (new_post if step % 2 else add_comment)(connection, step)
+        connection.execute('COMMIT')
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+
+
+def worker(path, options, deadline, operation, results, write_mode):
+    connection = connect(path, options)
+    begin = begin_statement(write_mode)
+    timings, errors, step = [], 0, 0
+    while time.monotonic() < deadline:
+        step += 1
+        started = time.perf_counter()
+        try:
+            if operation == 'write':
+                write(connection, begin, step)
+            else:
+                read_feed(connection, step)
+        except sqlite3.OperationalError:
+            # database is locked: запрос пользователя получил бы 500
+            errors += 1
+            continue
+        timings.append(time.perf_counter() - started)
+    connection.close()
+    results.append((operation, timings, errors))
+
+
+def measure(options, write_mode, readers, writers, duration, rows):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        seed(path, options, rows)
+        results = []
+        deadline = time.monotonic() + duration
+        threads = [
+            threading.Thread(target=worker, args=(
+                path, options, deadline, operation, results, write_mode
+            ))
+            for operation in ['read'] * readers + ['write'] * writers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    report = {}
+    for operation in ('read', 'write'):
+        timings = [value * 1000 for kind, values, _ in results
+                   if kind == operation for value in values]
+        report[operation] = {
+            'per_second': round(len(timings) / duration, 1),
+            'p50_ms': round(statistics.median(timings), 3) if timings else 0,
+            'p95_ms': round(percentile(timings, 95), 3),
+            'errors': sum(errors for kind, _, errors in results
+                          if kind == operation),
+        }
+    return report
+
+
+def run(options, readers=8, writers=4, duration=5.0, rows=10000):
+    '''Сравнивает стандартный SQLite и настройки options под нагрузкой.
+
+    Читатели листают ленту, писатели добавляют посты и комментарии
+    транзакциями, начинающимися с чтения: в настроенном режиме
+    с BEGIN IMMEDIATE, как atomic_write(). Каждый режим работает
+    с отдельной свежей базой: journal_mode=WAL сохраняется в файле.
+    Возвращает {режим: {read|write: {per_second, p50_ms, p95_ms,
+    errors}}}, где errors - запросы, упавшие с "database is locked".
+    '''
+    return {
+        'stock': measure(STOCK, None, readers, writers, duration, rows),
+        'tuned': measure(options, 'IMMEDIATE', readers, writers, duration,
+                         rows),
+    }
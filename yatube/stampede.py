@@ -0,0 +1,88 @@
+import math
+import random
+import time
+
+from django.core.cache import cache as default_cache
+
+# Насколько раньше срока начинаем обновлять значение. 1 - по XFetch,
+# больше - раньше и чаще.
+BETA = 1.0
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+def lock_key(key):
+    # Префикс, а не суффикс: блокировка не должна попасть в кэш
+    # процесса вместе с ключами значения (см. yatube.cache)
+    return f'lock:{key}'
+
+
+def should_refresh(expires_at, delta, beta=BETA):
+    '''Вероятностное раннее обновление (XFetch).
+
+    Чем ближе срок и чем дольше значение считалось, тем вероятнее,
+    что очередной запрос обновит его заранее. Так обновление
+    достаётся одному запросу, а не всем сразу в момент истечения.
+    '''
+    if expires_at is None:
+        return False
+    return time.time() - delta * beta * math.log(1 - random.random()) >= (
+        expires_at
+    )
+
+
+def get_or_compute(key, compute, timeout, cache=default_cache, beta=BETA,
+                   stale=None, lock_timeout=LOCK_TIMEOUT):
+    '''Значение из кэша или compute(), без лавины пересчётов.
+
+    В кэше значение лежит дольше timeout на stale секунд (по умолчанию
+    ещё timeout). Устаревшее или близкое к сроку значение
+    пересчитывает только запрос, взявший блокировку, остальные
+    в это время отдают старое. Если старого нет, они ждут пересчёта
+    до lock_timeout секунд и только потом считают сами.
+    '''
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires_at, delta = entry
+        if not should_refresh(expires_at, delta, beta):
+            return value
+    acquired = cache.add(lock_key(key), True, lock_timeout)
+    if not acquired:
+        if entry is not None:
+            return entry[0]
+        entry = wait_for(key, cache, lock_timeout)
+        if entry is not None:
+            return entry[0]
+        # Владелец не дождался или ушёл без значения: пробуем взять
+        # блокировку снова, а чужую не трогаем
+        acquired = cache.add(lock_key(key), True, lock_timeout)
+    try:
+        return store(key, compute, timeout, cache, stale)
+    finally:
+        if acquired:
+            cache.delete(lock_key(key))
+
+
+def wait_for(key, cache, lock_timeout):
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(lock_key(key)) is None:
+            return None
+    return None
+
+
+def store(key, compute, timeout, cache, stale):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    if timeout is None:
+        cache.set(key, (value, None, delta), None)
+        return value
+    if stale is None:
+        stale = timeout
+    cache.set(key, (value, time.time() + timeout, delta), timeout + stale)
+    return value